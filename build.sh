@@ -1,4 +1,5 @@
 #!/usr/bin/env bash
 pip install -r requirements.txt
+python manage.py build_avatars
 python manage.py collectstatic --noinput
 python manage.py migrate
@@ -62,16 +62,29 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Static files are answered before sessions, auth and the profiler run
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'habits.middleware.CachedAuthenticationMiddleware',
+    'habits.sharding.ShardMiddleware',
+    'habits.middleware.UserTimezoneMiddleware',
+    'habits.profiling.RequestProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
 ]
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Hashed, compressed static files, served by WhiteNoise with a
+# far-future immutable Cache-Control header.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 
 ROOT_URLCONF = 'habit_tracker.urls'
@@ -102,9 +115,66 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent read-then-write
+            # transactions wait (up to timeout) instead of failing with
+            # "database is locked".
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Habit data is spread over HABITS_SHARD_COUNT SQLite files by user id
+# (see habits/sharding.py). Shard 0 is 'default', which also keeps auth,
+# sessions and admin. After changing the count run migrate_shards and
+# then rebalance_shards.
+HABITS_SHARD_COUNT = int(os.environ.get('HABITS_SHARD_COUNT', 1))
+
+for _i in range(1, HABITS_SHARD_COUNT):
+    DATABASES[f'shard_{_i}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db_shard_{_i}.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['habits.sharding.UserShardRouter']
+
+# Adds a second shard for the multi-shard tests
+TEST_RUNNER = 'habits.tests.runner.ShardedTestRunner'
+
+
+
+# Cache
+# Sessions and the logged-in user (with profile) are read from here so
+# authenticated pages don't pay for session/user SELECTs on every request.
+# The file backend is shared by all gunicorn workers on the box.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.django_cache',
+    }
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+HABITS_USER_CACHE_TIMEOUT = 300
+
+
+# On-demand profiling (staff only, X-Profile header or ?_profile=1)
+
+HABITS_PROFILER_ENABLED = True
+HABITS_PROFILE_DIR = BASE_DIR / 'profiles'
+HABITS_PROFILE_KEEP = 100
+
+
+# Email
+# Reports and reminders are written to files locally; point EMAIL_BACKEND
+# at SMTP in production.
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+DEFAULT_FROM_EMAIL = 'Habit Tracker <no-reply@habittracker.local>'
 
 
 # Password validation
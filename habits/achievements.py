@@ -0,0 +1,259 @@
+"""
+Rule-driven achievements.
+
+Each rule declares which kind of change can unlock it ("profile" or
+"log"), so a save only evaluates the rules it could possibly affect, and
+only those the user hasn't earned yet. Awards are stored in
+UserAchievement, which pages read with a single indexed query.
+"""
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import cached_property, partial
+from typing import Callable
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Habit, HabitLog, HabitLogArchive, UserAchievement
+from .sharding import shard_for_user, use_user_shard
+
+
+PROFILE = "profile"
+LOG = "log"
+
+
+@dataclass(frozen=True)
+class Rule:
+    code: str
+    title: str
+    trigger: str
+    check: Callable
+    per_habit: bool = False
+
+
+def _streak_rule(days, title):
+    return Rule(f"streak_{days}", title, PROFILE, lambda f: f.profile.best_streak >= days)
+
+
+def _level_rule(level):
+    return Rule(f"level_{level}", f"🎖️ Level {level}", PROFILE, lambda f: f.profile.level >= level)
+
+
+def _completions_rule(total):
+    return Rule(f"completions_{total}", f"✅ {total} Completions", LOG,
+                lambda f: f.total_completions >= total)
+
+
+def _habit_streak_rule(days):
+    return Rule(f"habit_streak_{days}", f"📅 {days} Days in a Row on One Habit", LOG,
+                lambda f: f.best_habit_streak[0] >= days, per_habit=True)
+
+
+RULES = [
+    _streak_rule(7, "🥉 Bronze Streak (7 days)"),
+    _streak_rule(30, "🥈 Silver Streak (30 days)"),
+    _streak_rule(100, "🥇 Gold Streak (100 days)"),
+    _streak_rule(365, "💎 Diamond Streak (365 days)"),
+    *[_level_rule(level) for level in (5, 10, 25, 50)],
+    *[_completions_rule(total) for total in (10, 100, 500, 1000, 5000)],
+    *[_habit_streak_rule(days) for days in (7, 30)],
+    Rule("perfect_week", "🌟 Perfect Week", LOG, lambda f: f.perfect_week),
+]
+
+RULES_BY_CODE = {rule.code: rule for rule in RULES}
+
+# Days of history needed to judge the longest per-habit streak rule
+HABIT_STREAK_WINDOW = 30
+
+
+def badges_for(user):
+    """Titles of the user's achievements, in the order they were earned."""
+    return [
+        RULES_BY_CODE[code].title
+        for code in UserAchievement.objects.filter(user=user).values_list("code", flat=True)
+        if code in RULES_BY_CODE
+    ]
+
+
+def longest_run(dates):
+    best = run = 0
+    previous = None
+    for day in sorted(dates):
+        run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+        best = max(best, run)
+        previous = day
+    return best
+
+
+def has_perfect_week(day_counts, habit_count, weeks=None):
+    if not habit_count:
+        return False
+    full_days = defaultdict(int)
+    for day, count in day_counts.items():
+        if count >= habit_count:
+            full_days[day.isocalendar()[:2]] += 1
+    return any(n == 7 for week, n in full_days.items() if weeks is None or week in weeks)
+
+
+# -------------------------
+# Facts rules are checked against
+# -------------------------
+class ProfileFacts:
+    def __init__(self, profile):
+        self.profile = profile
+
+
+class LogFacts:
+    """Facts around a set of changed (habit_id, date) pairs; each is queried at most once."""
+
+    def __init__(self, user_id, changes):
+        self.user_id = user_id
+        self.changes = changes
+
+    @cached_property
+    def total_completions(self):
+        live = HabitLog.objects.filter(habit__user_id=self.user_id, completed=True).count()
+        archived = HabitLogArchive.objects.filter(habit__user_id=self.user_id).aggregate(
+            n=Sum("completed_days"))["n"] or 0
+        return live + archived
+
+    @cached_property
+    def best_habit_streak(self):
+        habit_ids = {habit_id for habit_id, _ in self.changes}
+        dates = [day for _, day in self.changes]
+        rows = HabitLog.objects.filter(
+            habit_id__in=habit_ids, completed=True,
+            date__range=(min(dates) - timedelta(days=HABIT_STREAK_WINDOW), max(dates)),
+        ).values_list("habit_id", "date")
+
+        per_habit = defaultdict(list)
+        for habit_id, day in rows:
+            per_habit[habit_id].append(day)
+        return max(
+            ((longest_run(days), habit_id) for habit_id, days in per_habit.items()),
+            default=(0, None),
+        )
+
+    @cached_property
+    def perfect_week(self):
+        today = timezone.localdate()
+        weeks = {}
+        for _, day in self.changes:
+            monday = day - timedelta(days=day.weekday())
+            if monday + timedelta(days=6) <= today:
+                weeks[monday.isocalendar()[:2]] = monday
+        if not weeks:
+            return False
+
+        # Archived habits are off the dashboard and can't be checked in
+        habit_count = Habit.objects.filter(user_id=self.user_id).active().count()
+        counts = {}
+        for monday in weeks.values():
+            counts.update({
+                row["date"]: row["n"]
+                for row in HabitLog.objects.filter(
+                    habit__user_id=self.user_id, habit__archived=False, completed=True,
+                    date__range=(monday, monday + timedelta(days=6)),
+                ).values("date").annotate(n=Count("id"))
+            })
+        return has_perfect_week(counts, habit_count, set(weeks))
+
+
+class HistoryFacts:
+    """Facts over a user's whole history, built in bulk by the backfill command."""
+
+    def __init__(self, profile, total_completions, habit_dates, habit_count):
+        self.profile = profile
+        self.total_completions = total_completions
+        self.habit_dates = habit_dates
+        self.habit_count = habit_count
+
+    @cached_property
+    def best_habit_streak(self):
+        return max(
+            ((longest_run(days), habit_id) for habit_id, days in self.habit_dates.items()),
+            default=(0, None),
+        )
+
+    @cached_property
+    def perfect_week(self):
+        counts = defaultdict(int)
+        for days in self.habit_dates.values():
+            for day in days:
+                counts[day] += 1
+        return has_perfect_week(counts, self.habit_count)
+
+
+# -------------------------
+# Evaluation
+# -------------------------
+def check_rules(user_id, rules, facts):
+    return [
+        UserAchievement(
+            user_id=user_id,
+            code=rule.code,
+            habit_id=facts.best_habit_streak[1] if rule.per_habit else None,
+        )
+        for rule in rules
+        if rule.check(facts)
+    ]
+
+
+def award(user_id, rules, facts):
+    earned = check_rules(user_id, rules, facts)
+    UserAchievement.objects.bulk_create(earned, ignore_conflicts=True)
+    return earned
+
+
+def earned_codes(user_id):
+    return set(UserAchievement.objects.filter(user_id=user_id).values_list("code", flat=True))
+
+
+def evaluate_profile(profile):
+    facts = ProfileFacts(profile)
+    # Profile rules are free to check, so only look up earned badges
+    # once one of them actually passes.
+    passing = [r for r in RULES if r.trigger == PROFILE and r.check(facts)]
+    if not passing:
+        return []
+    earned = earned_codes(profile.user_id)
+    return award(profile.user_id, [r for r in passing if r.code not in earned], facts)
+
+
+def evaluate_logs(user_id, changes):
+    earned = earned_codes(user_id)
+    pending = [r for r in RULES if r.trigger == LOG and r.code not in earned]
+    if not pending:
+        return []
+    return award(user_id, pending, LogFacts(user_id, changes))
+
+
+# Log saves are coalesced per user until the surrounding transaction
+# commits, so saving a whole dashboard evaluates the rules once.
+_pending = threading.local()
+
+
+def queue_log_change(user_id, habit_id, day):
+    changes = _pending.__dict__.setdefault("changes", defaultdict(set))
+    changes[user_id].add((habit_id, day))
+    # Later callbacks for the same user find nothing left to flush
+    transaction.on_commit(partial(_flush_logs, user_id), using=shard_for_user(user_id))
+
+
+def _flush_logs(user_id):
+    changes = _pending.__dict__.get("changes", {}).pop(user_id, None)
+    if changes:
+        with use_user_shard(user_id):
+            evaluate_logs(user_id, changes)
+
+
+def _evaluate_profile_on_shard(profile):
+    with use_user_shard(profile.user_id):
+        evaluate_profile(profile)
+
+
+def queue_profile_change(profile):
+    transaction.on_commit(partial(_evaluate_profile_on_shard, profile), using=shard_for_user(profile.user_id))
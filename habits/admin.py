@@ -1,14 +1,21 @@
+import re
+
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Avg, Count, Max, Sum
+from django.utils.html import format_html, format_html_join
 
-from .models import Habit, UserProfile
+from .models import Habit, RequestProfile, UserProfile
+from .profiling import delete_files, load_queries, load_stats
+from .deletion import soft_delete_user
+from .sharding import use_user_shard
 
 
 class HabitInline(admin.TabularInline):
     model = Habit
     extra = 0
-    fields = ("name", "created_at")
+    fields = ("name", "position", "archived", "created_at")
     readonly_fields = ("created_at",)
 
 
@@ -21,6 +28,89 @@ class UserProfileInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = [UserProfileInline, HabitInline]
 
+    def change_view(self, request, object_id, form_url="", extra_context=None):
+        # Inlines read and write the edited user's shard, not the admin's
+        if not re.fullmatch(r"[0-9]+", str(object_id)):
+            return super().change_view(request, object_id, form_url, extra_context)
+        with use_user_shard(object_id):
+            return super().change_view(request, object_id, form_url, extra_context)
+
+    # Accounts are soft deleted (deactivated, habits hidden) and removed
+    # for good by purge_deleted, so deleting never walks their logs.
+    def get_deleted_objects(self, objs, request):
+        users = [format_html("{}: {}", User._meta.verbose_name.capitalize(), user) for user in objs]
+        return users, {User._meta.verbose_name_plural: len(users)}, set(), []
+
+    def delete_model(self, request, obj):
+        soft_delete_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            soft_delete_user(user)
+
 
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    change_list_template = "admin/habits/requestprofile/change_list.html"
+    list_display = ("created_at", "view_name", "method", "path", "user",
+                    "status_code", "duration_ms", "query_count", "query_time_ms")
+    list_filter = ("view_name", "method", "status_code")
+    search_fields = ("path", "user__username")
+    readonly_fields = ("created_at", "user", "method", "path", "view_name",
+                       "status_code", "duration_ms", "query_count", "query_time_ms",
+                       "top_functions", "sql")
+    exclude = ("file_stem",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Top functions (cumulative)")
+    def top_functions(self, obj):
+        try:
+            return format_html("<pre>{}</pre>", load_stats(obj))
+        except OSError:
+            return "Profile file has been removed"
+
+    @admin.display(description="SQL")
+    def sql(self, obj):
+        try:
+            queries = load_queries(obj)
+        except OSError:
+            return "Query file has been removed"
+        return format_html(
+            "<ol>{}</ol>",
+            format_html_join("", "<li><code>{}</code> ({} s)</li>",
+                             ((q["sql"], q["time"]) for q in queries)),
+        )
+
+    def changelist_view(self, request, extra_context=None):
+        by_view = (
+            RequestProfile.objects.values("view_name")
+            .annotate(
+                profiles=Count("id"),
+                total_ms=Sum("duration_ms"),
+                avg_ms=Avg("duration_ms"),
+                max_ms=Max("duration_ms"),
+                avg_queries=Avg("query_count"),
+            )
+            .order_by("-total_ms")
+        )
+        return super().changelist_view(
+            request, {**(extra_context or {}), "time_by_view": by_view}
+        )
+
+    def delete_model(self, request, obj):
+        delete_files(obj)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            delete_files(obj)
+        super().delete_queryset(request, queryset)
@@ -0,0 +1,164 @@
+"""
+Archival of old HabitLog rows into per-habit-per-year summaries.
+
+Only completed days are kept: a missing log and a log with
+completed=False mean the same thing everywhere in the app.
+"""
+import zlib
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import HabitLog, HabitLogArchive
+
+
+# Logs younger than this are never archived, so views that only look
+# at recent days (heatmap, weekly, dashboard) never need the archive.
+ARCHIVE_AFTER_DAYS = getattr(settings, "HABITS_ARCHIVE_AFTER_DAYS", 400)
+
+
+def archive_horizon(today=None):
+    return (today or timezone.localdate()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+# -------------------------
+# Bitmap encoding
+# -------------------------
+def encode_days(days):
+    bits = 0
+    for day in days:
+        bits |= 1 << day
+    return zlib.compress(bits.to_bytes(46, "little"))
+
+
+def decode_days(bitmap):
+    bits = int.from_bytes(zlib.decompress(bytes(bitmap)), "little")
+    days = []
+    while bits:
+        low = bits & -bits
+        days.append(low.bit_length() - 1)
+        bits ^= low
+    return days
+
+
+def archive_dates(archive):
+    start = date(archive.year, 1, 1)
+    return [start + timedelta(days=d) for d in decode_days(archive.bitmap)]
+
+
+# -------------------------
+# Move logs in / out
+# -------------------------
+def archive_logs(cutoff, batch_size=200):
+    """
+    Move logs dated before cutoff into HabitLogArchive, one batch of
+    habits per transaction. Works on the current shard (see use_shard).
+    """
+    using = router.db_for_write(HabitLog)
+    habit_ids = list(
+        HabitLog.objects.filter(date__lt=cutoff)
+        .order_by("habit_id").values_list("habit_id", flat=True).distinct()
+    )
+    moved = 0
+
+    for i in range(0, len(habit_ids), batch_size):
+        batch = habit_ids[i:i + batch_size]
+
+        with transaction.atomic(using=using):
+            old_logs = HabitLog.objects.filter(habit_id__in=batch, date__lt=cutoff)
+
+            days = defaultdict(set)
+            for habit_id, day in old_logs.filter(completed=True).values_list("habit_id", "date"):
+                days[(habit_id, day.year)].add(day.timetuple().tm_yday - 1)
+
+            existing = {
+                (a.habit_id, a.year): a
+                for a in HabitLogArchive.objects.filter(habit_id__in=batch)
+            }
+
+            to_create, to_update = [], []
+            for key, new_days in days.items():
+                archive = existing.get(key)
+                if archive:
+                    new_days.update(decode_days(archive.bitmap))
+                    archive.bitmap = encode_days(new_days)
+                    archive.completed_days = len(new_days)
+                    to_update.append(archive)
+                else:
+                    to_create.append(HabitLogArchive(
+                        habit_id=key[0], year=key[1],
+                        bitmap=encode_days(new_days), completed_days=len(new_days),
+                    ))
+
+            HabitLogArchive.objects.bulk_create(to_create)
+            HabitLogArchive.objects.bulk_update(to_update, ["bitmap", "completed_days"])
+            moved += old_logs.delete()[0]
+
+    return moved
+
+
+def restore_logs(habits, year=None):
+    """Recreate completed HabitLog rows from the archive and drop the archive rows."""
+    archives = HabitLogArchive.objects.filter(habit__in=habits)
+    if year is not None:
+        archives = archives.filter(year=year)
+
+    restored = 0
+    with transaction.atomic(using=router.db_for_write(HabitLog)):
+        for archive in archives:
+            logs = [
+                HabitLog(habit_id=archive.habit_id, date=day, completed=True)
+                for day in archive_dates(archive)
+            ]
+            restored += len(HabitLog.objects.bulk_create(logs, ignore_conflicts=True))
+        archives.delete()
+
+    return restored
+
+
+# -------------------------
+# Reads spanning live + archived data
+# -------------------------
+def completion_counts(user, start, end):
+    """
+    {date: completed habits} for start..end over the user's active
+    (non-archived) habits, reading the archive only when needed.
+    """
+    counts = Counter({
+        row["date"]: row["count"]
+        for row in HabitLog.objects
+        .filter(habit__user=user, habit__archived=False, completed=True, date__range=(start, end))
+        .values("date")
+        .annotate(count=Count("id"))
+    })
+
+    if start < archive_horizon():
+        archives = HabitLogArchive.objects.filter(
+            habit__user=user, habit__archived=False, year__range=(start.year, end.year)
+        )
+        for archive in archives:
+            for day in archive_dates(archive):
+                if start <= day <= end:
+                    counts[day] += 1
+
+    return counts
+
+
+def completions_by_habit_name(user):
+    """Counter of all-time completions per habit name, live + archived."""
+    totals = Counter()
+    for row in (
+        HabitLog.objects.filter(habit__user=user, completed=True)
+        .values("habit__name").annotate(c=Count("id"))
+    ):
+        totals[row["habit__name"]] += row["c"]
+    for row in (
+        HabitLogArchive.objects.filter(habit__user=user)
+        .values("habit__name").annotate(c=Sum("completed_days"))
+    ):
+        totals[row["habit__name"]] += row["c"]
+    return totals
@@ -0,0 +1,67 @@
+"""
+Resized avatar variants.
+
+build_avatars writes every avatar*.gif at a few display sizes as
+animated WebP into static/avatars/variants/. The {% avatar %} tag lets
+the browser pick the smallest one that fits. The original GIF stays the
+fallback: the sources are small, frame-delta encoded GIFs, and
+re-encoding resized frames as GIF often comes out larger than they are.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageSequence
+
+
+AVATAR_DIR = Path(__file__).resolve().parent / "static" / "avatars"
+VARIANT_DIR = AVATAR_DIR / "variants"
+
+# CSS pixel sizes avatars are shown at, and their 2x versions
+VARIANT_SIZES = (48, 60, 96, 120, 240)
+
+
+def variant_sizes(width):
+    # Never upscale: sizes above the source collapse onto the source width
+    return sorted({min(size, width) for size in VARIANT_SIZES})
+
+
+def variant_path(stem, size):
+    return VARIANT_DIR / f"{stem}-{size}.webp"
+
+
+def load_frames(source):
+    with Image.open(source) as image:
+        durations = [frame.info.get("duration", 100) for frame in ImageSequence.Iterator(image)]
+        frames = [frame.convert("RGBA") for frame in ImageSequence.Iterator(image)]
+        loop = image.info.get("loop", 0)
+    return frames, durations, loop
+
+
+def save_webp(frames, durations, loop, path):
+    frames[0].save(
+        path, save_all=True, append_images=frames[1:],
+        duration=durations, loop=loop, quality=80, method=6,
+    )
+
+
+def build_variants(source, force=False):
+    """Write all variants of one avatar; returns the paths actually (re)built."""
+    frames, durations, loop = load_frames(source)
+    VARIANT_DIR.mkdir(parents=True, exist_ok=True)
+
+    built = []
+    for size in variant_sizes(frames[0].width):
+        path = variant_path(source.stem, size)
+        if not force and path.exists() and path.stat().st_mtime >= source.stat().st_mtime:
+            continue
+        resized = [frame.resize((size, size), Image.LANCZOS) for frame in frames]
+        save_webp(resized, durations, loop, path)
+        built.append(path)
+    return built
+
+
+@lru_cache(maxsize=None)
+def available_variants(stem):
+    """[(size, static path), ...] of the variants built for an avatar."""
+    sizes = sorted(int(path.stem.rsplit("-", 1)[1]) for path in VARIANT_DIR.glob(f"{stem}-*.webp"))
+    return [(size, f"avatars/variants/{stem}-{size}.webp") for size in sizes]
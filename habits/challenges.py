@@ -0,0 +1,191 @@
+"""
+Team challenges with materialized progress.
+
+Each member links one of their habits. ChallengeMembership.completed_days
+and ChallengeDay.completed_members are adjusted by +1/-1 whenever a
+linked habit's log flips completed (see signals.update_challenge_progress),
+so the board reads a few small rows whatever the number of members.
+
+Bulk writes that skip post_save (archiving, purging, imports) are not
+tracked; rebuild_challenges recomputes everything from the logs and
+the archive.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.db import router, transaction
+from django.db.models import Count, F
+
+from .archive import archive_dates, archive_horizon
+from .models import Challenge, ChallengeDay, ChallengeMembership, HabitLog, HabitLogArchive
+from .sharding import group_by_shard, shard_for_user, use_shard, use_user_shard
+
+
+def create_challenge(owner, name, start_date, days, description=""):
+    with transaction.atomic(using=router.db_for_write(Challenge)):
+        challenge = Challenge.objects.create(
+            owner=owner, name=name, description=description,
+            start_date=start_date, end_date=start_date + timedelta(days=days - 1),
+        )
+        ChallengeDay.objects.bulk_create([
+            ChallengeDay(challenge=challenge, date=start_date + timedelta(days=i))
+            for i in range(days)
+        ])
+    return challenge
+
+
+def _archived_days(archives, challenge):
+    """(habit_id, date) pairs from archive rows inside the challenge window."""
+    # Windows newer than the horizon can't have been archived yet
+    if challenge.start_date >= archive_horizon():
+        return []
+    return [
+        (archive.habit_id, day)
+        for archive in archives.filter(year__range=(challenge.start_date.year, challenge.end_date.year))
+        for day in archive_dates(archive)
+        if challenge.start_date <= day <= challenge.end_date
+    ]
+
+
+def completed_dates(user_id, habit_id, challenge):
+    # all_objects: a soft-deleted habit's days still have to be taken back
+    with use_user_shard(user_id):
+        dates = set(
+            HabitLog.all_objects.filter(
+                habit_id=habit_id, completed=True,
+                date__range=(challenge.start_date, challenge.end_date),
+            ).values_list("date", flat=True)
+        )
+        archives = HabitLogArchive.all_objects.filter(habit_id=habit_id)
+        dates.update(day for _, day in _archived_days(archives, challenge))
+    return dates
+
+
+def _shift_days(challenge_id, dates, delta):
+    if dates:
+        ChallengeDay.objects.filter(challenge_id=challenge_id, date__in=dates).update(
+            completed_members=F("completed_members") + delta
+        )
+
+
+def join(challenge, user, habit):
+    # Days already completed inside the window count straight away
+    dates = completed_dates(user.pk, habit.pk, challenge)
+    with transaction.atomic(using=router.db_for_write(ChallengeMembership)):
+        membership = ChallengeMembership.objects.create(
+            challenge=challenge, user=user, habit_id=habit.pk, completed_days=len(dates),
+        )
+        _shift_days(challenge.pk, dates, 1)
+    return membership
+
+
+def leave(membership):
+    dates = completed_dates(membership.user_id, membership.habit_id, membership.challenge)
+    with transaction.atomic(using=router.db_for_write(ChallengeMembership)):
+        _shift_days(membership.challenge_id, dates, -1)
+        membership.delete()
+
+
+def leave_all(user, habit=None):
+    memberships = ChallengeMembership.objects.filter(user=user).select_related("challenge")
+    if habit is not None:
+        memberships = memberships.filter(habit_id=habit.pk)
+    for membership in memberships:
+        leave(membership)
+
+
+# -------------------------
+# Incremental updates
+# -------------------------
+def apply_log_change(user_id, habit_id, day, delta):
+    memberships = list(
+        ChallengeMembership.objects.filter(
+            user_id=user_id, habit_id=habit_id,
+            challenge__start_date__lte=day, challenge__end_date__gte=day,
+        ).values_list("id", "challenge_id")
+    )
+    if not memberships:
+        return
+
+    with transaction.atomic(using=router.db_for_write(ChallengeMembership)):
+        ChallengeMembership.objects.filter(id__in=[m for m, _ in memberships]).update(
+            completed_days=F("completed_days") + delta
+        )
+        ChallengeDay.objects.filter(challenge_id__in=[c for _, c in memberships], date=day).update(
+            completed_members=F("completed_members") + delta
+        )
+
+
+def queue_log_change(user_id, habit_id, day, delta):
+    # Central counters only move once the shard's write has committed
+    transaction.on_commit(
+        partial(apply_log_change, user_id, habit_id, day, delta),
+        using=shard_for_user(user_id),
+    )
+
+
+def rebuild(challenge):
+    """Recompute a challenge's counters from the members' logs and archive."""
+    memberships = list(challenge.memberships.all())
+    by_user = {m.user_id: m for m in memberships}
+    per_day = defaultdict(int)
+    completed = defaultdict(int)
+
+    for alias, user_ids in group_by_shard(by_user).items():
+        habit_owner = {by_user[u].habit_id: u for u in user_ids}
+        with use_shard(alias):
+            rows = list(
+                HabitLog.objects.filter(
+                    habit_id__in=habit_owner, completed=True,
+                    date__range=(challenge.start_date, challenge.end_date),
+                ).values_list("habit_id", "date")
+            )
+            rows += _archived_days(HabitLogArchive.objects.filter(habit_id__in=habit_owner), challenge)
+            for habit_id, day in rows:
+                completed[habit_owner[habit_id]] += 1
+                per_day[day] += 1
+
+    days = list(challenge.days.all())
+    for membership in memberships:
+        membership.completed_days = completed[membership.user_id]
+    for challenge_day in days:
+        challenge_day.completed_members = per_day[challenge_day.date]
+
+    with transaction.atomic(using=router.db_for_write(ChallengeMembership)):
+        ChallengeMembership.objects.bulk_update(memberships, ["completed_days"])
+        ChallengeDay.objects.bulk_update(days, ["completed_members"])
+
+
+# -------------------------
+# Reads
+# -------------------------
+def member_counts(challenges):
+    return dict(
+        ChallengeMembership.objects.filter(challenge__in=challenges)
+        .values_list("challenge_id").annotate(n=Count("id"))
+    )
+
+
+def board(challenge, today):
+    """Per-member and per-day progress, from the materialized rows only."""
+    members = list(
+        challenge.memberships.select_related("user")
+        .only("user__username", "completed_days", "user_id", "habit_id", "challenge_id")
+        .order_by("-completed_days", "joined_at")
+    )
+    elapsed = max(0, min((today - challenge.start_date).days + 1, challenge.length))
+
+    days = [
+        {
+            "date": day.date,
+            "completed": day.completed_members,
+            "rate": int(day.completed_members / len(members) * 100) if members else 0,
+            "future": day.date > today,
+        }
+        for day in challenge.days.all()
+    ]
+    for member in members:
+        member.rate = int(member.completed_days / elapsed * 100) if elapsed else 0
+
+    return {"members": members, "days": days, "elapsed": elapsed}
@@ -0,0 +1,119 @@
+"""
+Soft delete and purge of habits and accounts.
+
+Deleting only stamps deleted_at, which hides a habit and its logs
+everywhere at once (see HabitManager and LiveHabitDataManager) in a
+single UPDATE. purge_deleted removes the rows later with set-based
+DELETE statements in bounded batches: no model instances are loaded
+and no transaction holds SQLite's write lock for long.
+"""
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .challenges import leave_all
+from .models import Habit, HabitLog, HabitLogArchive, UserAchievement, UserProfile
+from .sharding import use_user_shard
+from .signals import publish
+
+
+def soft_delete_habit(habit):
+    # A deleted habit can't count towards a challenge any more
+    leave_all(habit.user_id, habit=habit)
+    Habit.objects.filter(pk=habit.pk).update(deleted_at=timezone.now())
+    publish(habit.user_id, "habit", {"habit": habit.id, "active": False})
+
+
+def soft_delete_user(user):
+    """Deactivate the account, hide all of its habits and leave its challenges."""
+    now = timezone.now()
+    leave_all(user)
+    with use_user_shard(user.pk):
+        with transaction.atomic(using=router.db_for_write(Habit)):
+            Habit.objects.filter(user=user).update(deleted_at=now)
+            UserProfile.objects.filter(user=user, deleted_at__isnull=True).update(
+                deleted_at=now, next_reminder_at=None,
+            )
+    user.is_active = False
+    user.save(update_fields=["is_active"])  # also drops the cached user
+
+
+# -------------------------
+# Purge (current shard, see use_shard)
+# -------------------------
+def _table(model, connection):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _execute(using, sql, params):
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def _delete_in_batches(using, sql, params, batch_size):
+    """Run a DELETE ... LIMIT-style statement until it removes less than a batch."""
+    deleted = 0
+    while True:
+        n = _execute(using, sql, [*params, batch_size])
+        deleted += n
+        if n < batch_size:
+            return deleted
+
+
+def purge_habits(cutoff, batch_size=5000):
+    """Hard-delete habits deleted before cutoff, dependents first. Returns {model: rows}."""
+    using = router.db_for_write(Habit)
+    connection = connections[using]
+    habit = _table(Habit, connection)
+    deleted_habits = f"SELECT id FROM {habit} WHERE deleted_at IS NOT NULL AND deleted_at <= %s"
+
+    counts = {}
+    for model in (HabitLog, HabitLogArchive):
+        table = _table(model, connection)
+        counts[model.__name__] = _delete_in_batches(
+            using,
+            f"DELETE FROM {table} WHERE id IN ("
+            f"SELECT id FROM {table} WHERE habit_id IN ({deleted_habits}) LIMIT %s)",
+            [cutoff],
+            batch_size,
+        )
+
+    # Earned achievements stay; they just lose the habit they were won on
+    _execute(
+        using,
+        f"UPDATE {_table(UserAchievement, connection)} SET habit_id = NULL "
+        f"WHERE habit_id IN ({deleted_habits})",
+        [cutoff],
+    )
+
+    counts["Habit"] = _delete_in_batches(
+        using,
+        f"DELETE FROM {habit} WHERE id IN ({deleted_habits} LIMIT %s)",
+        [cutoff],
+        batch_size,
+    )
+    return counts
+
+
+def purge_users(cutoff, batch_size=500):
+    """
+    Hard-delete accounts deleted before cutoff whose data lives on the
+    current shard. Run purge_habits first so their habits are gone.
+    """
+    purged = 0
+    while True:
+        user_ids = list(
+            UserProfile.objects.filter(deleted_at__lte=cutoff)
+            .values_list("user_id", flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return purged
+
+        using = router.db_for_write(UserProfile)
+        with transaction.atomic(using=using):
+            UserAchievement.objects.filter(user_id__in=user_ids).delete()
+            UserProfile.objects.filter(user_id__in=user_ids).delete()
+        # The central rows; nothing is left on the shard to cascade to
+        User.objects.filter(pk__in=user_ids).delete()
+        purged += len(user_ids)
@@ -1,5 +1,7 @@
+from zoneinfo import available_timezones
+
 from django import forms
-from .models import Habit
+from .models import Challenge, Habit, UserProfile
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
@@ -10,6 +12,29 @@ class HabitForm(forms.ModelForm):
         fields = ['name']
 
 
+class ReminderForm(forms.ModelForm):
+    timezone = forms.ChoiceField(choices=[(tz, tz) for tz in sorted(available_timezones())])
+
+    class Meta:
+        model = UserProfile
+        fields = ['reminder_time', 'timezone']
+        widgets = {'reminder_time': forms.TimeInput(attrs={'type': 'time'})}
+        labels = {'reminder_time': 'Daily reminder at'}
+        help_texts = {'reminder_time': 'Leave empty to turn reminders off.'}
+
+
+class ChallengeForm(forms.ModelForm):
+    days = forms.IntegerField(min_value=1, max_value=365, initial=30, label="Length (days)")
+
+    class Meta:
+        model = Challenge
+        fields = ['name', 'description', 'start_date']
+        widgets = {
+            'description': forms.Textarea(attrs={'rows': 3}),
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+        }
+
+
 class SignupForm(forms.ModelForm):
     password1 = forms.CharField(
         widget=forms.PasswordInput,
@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from habits.archive import ARCHIVE_AFTER_DAYS, archive_logs
+from habits.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Move HabitLog rows older than the cutoff into compressed per-habit "
+        "yearly summaries. Only completed days are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=ARCHIVE_AFTER_DAYS,
+            help=f"Archive logs older than this many days (minimum {ARCHIVE_AFTER_DAYS}).",
+        )
+        parser.add_argument("--before", type=date.fromisoformat, help="Explicit cutoff date (YYYY-MM-DD).")
+        parser.add_argument("--batch-size", type=int, default=200, help="Habits per transaction.")
+
+    def handle(self, *args, **options):
+        latest = timezone.localdate() - timedelta(days=ARCHIVE_AFTER_DAYS)
+        cutoff = options["before"] or timezone.localdate() - timedelta(days=options["days"])
+
+        if cutoff > latest:
+            raise CommandError(
+                f"Cutoff {cutoff} is too recent; logs newer than {latest} must stay live "
+                "(HABITS_ARCHIVE_AFTER_DAYS)."
+            )
+
+        moved = 0
+        for alias in shard_aliases():
+            with use_shard(alias):
+                moved += archive_logs(cutoff, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} logs dated before {cutoff}"))
@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from habits.achievements import RULES, HistoryFacts, check_rules
+from habits.archive import archive_dates
+from habits.models import Habit, HabitLog, HabitLogArchive, UserAchievement, UserProfile
+from habits.sharding import group_by_shard, use_shard
+
+
+class Command(BaseCommand):
+    help = "Grant achievements earned by existing history, a chunk of users at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Users per chunk.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        user_ids = User.objects.order_by("pk").values_list("pk", flat=True)
+        awarded = users = 0
+
+        last_pk = 0
+        while True:
+            chunk = list(user_ids.filter(pk__gt=last_pk)[:batch_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1]
+            users += len(chunk)
+            for alias, ids in group_by_shard(chunk).items():
+                with use_shard(alias):
+                    awarded += self.backfill_chunk(ids)
+            self.stdout.write(f"{users} users processed, {awarded} achievements granted")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {awarded} achievements granted"))
+
+    def backfill_chunk(self, user_ids):
+        profiles = {p.user_id: p for p in UserProfile.objects.filter(user_id__in=user_ids)}
+
+        habit_counts = dict(
+            Habit.objects.filter(user_id__in=user_ids).active()
+            .values_list("user_id").annotate(n=Count("id"))
+        )
+
+        totals = defaultdict(int)
+        habit_dates = defaultdict(lambda: defaultdict(list))
+
+        logs = HabitLog.objects.filter(habit__user_id__in=user_ids, completed=True)
+        for user_id, habit_id, day in logs.values_list("habit__user_id", "habit_id", "date").iterator():
+            totals[user_id] += 1
+            habit_dates[user_id][habit_id].append(day)
+
+        for archive in HabitLogArchive.objects.filter(habit__user_id__in=user_ids).select_related("habit"):
+            user_id = archive.habit.user_id
+            totals[user_id] += archive.completed_days
+            habit_dates[user_id][archive.habit_id].extend(archive_dates(archive))
+
+        earned = defaultdict(set)
+        for user_id, code in UserAchievement.objects.filter(user_id__in=user_ids).values_list("user_id", "code"):
+            earned[user_id].add(code)
+
+        new = []
+        for user_id in user_ids:
+            profile = profiles.get(user_id)
+            if profile is None:
+                continue
+            facts = HistoryFacts(profile, totals[user_id], habit_dates[user_id], habit_counts.get(user_id, 0))
+            pending = [rule for rule in RULES if rule.code not in earned[user_id]]
+            new += check_rules(user_id, pending, facts)
+
+        UserAchievement.objects.bulk_create(new, ignore_conflicts=True)
+        return len(new)
@@ -0,0 +1,141 @@
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from habits.middleware import user_cache_key
+from habits.models import Habit, HabitLog, UserProfile
+from habits.sharding import shard_aliases, use_user_shard
+
+
+DEFAULT_VIEWS = ["dashboard", "daily_chart_data", "weekly_analytics", "heatmap", "profile"]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time views and count their queries for a synthetic user (all data is rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--habits", type=int, default=10)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--views", default=",".join(DEFAULT_VIEWS))
+        parser.add_argument(
+            "--baseline",
+            action="store_true",
+            help="Also run with DB sessions and the stock AuthenticationMiddleware.",
+        )
+        parser.add_argument(
+            "--timezone",
+            help="Also run with the user's profile in this zone, against the site-zone run.",
+        )
+
+    def handle(self, *args, **options):
+        # The test client would otherwise close our connection mid-transaction
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+
+        try:
+            # The user is central, its data may be on any shard
+            with ExitStack() as stack:
+                for alias in shard_aliases():
+                    stack.enter_context(transaction.atomic(using=alias))
+                user = self.seed(options["habits"], options["days"])
+                views = [v.strip() for v in options["views"].split(",") if v.strip()]
+
+                if options["baseline"]:
+                    self.stdout.write(self.style.MIGRATE_HEADING("Baseline (db sessions, no user cache)"))
+                    with override_settings(**self.baseline_settings()):
+                        self.run(user, views, options["repeat"])
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Current settings ({settings.TIME_ZONE})"))
+                self.run(user, views, options["repeat"])
+
+                if options["timezone"]:
+                    with use_user_shard(user.pk):
+                        UserProfile.objects.filter(user=user).update(timezone=options["timezone"])
+                    cache.delete(user_cache_key(user.pk))  # update() skips the signal
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"User timezone ({options['timezone']})"))
+                    self.run(user, views, options["repeat"])
+                raise Rollback
+        except Rollback:
+            cache.delete(user_cache_key(user.pk))
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+    def baseline_settings(self):
+        # Stock Django auth/session path, for comparison
+        middleware = [
+            "django.contrib.auth.middleware.AuthenticationMiddleware"
+            if m == "habits.middleware.CachedAuthenticationMiddleware" else m
+            for m in settings.MIDDLEWARE
+        ]
+        return {
+            "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+            "MIDDLEWARE": middleware,
+        }
+
+    def seed(self, n_habits, n_days):
+        user = User.objects.create_user(username="__benchmark__", password="x")
+        with use_user_shard(user.pk):
+            habits = Habit.objects.bulk_create(
+                [Habit(user=user, name=f"Habit {i}") for i in range(n_habits)]
+            )
+
+            today = timezone.localdate()
+            HabitLog.objects.bulk_create(
+                [
+                    HabitLog(habit=habit, date=today - timedelta(days=d), completed=(d + i) % 3 != 0)
+                    for i, habit in enumerate(habits)
+                    for d in range(1, n_days + 1)
+                ],
+                batch_size=1000,
+            )
+        self.stdout.write(f"Seeded {n_habits} habits x {n_days} days of logs")
+        return user
+
+    def run(self, user, views, repeat):
+        client = Client()
+        client.force_login(user)
+
+        self.stdout.write(f"{'view':<20}{'queries':>8}{'median ms':>12}{'p95 ms':>10}")
+
+        for name in views:
+            url = reverse(name)
+            client.get(url)  # warm caches
+
+            with ExitStack() as stack:
+                captures = [
+                    stack.enter_context(CaptureQueriesContext(connections[alias]))
+                    for alias in connections
+                ]
+                client.get(url)
+            n_queries = sum(len(c.captured_queries) for c in captures)
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f"{name:<20}{n_queries:>8}"
+                f"{statistics.median(timings):>12.2f}{p95:>10.2f}"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from habits.avatars import AVATAR_DIR, VARIANT_DIR, build_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate resized animated WebP variants of the avatars for "
+        "srcset. Run before collectstatic (see build.sh)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild variants that are up to date.")
+
+    def handle(self, *args, **options):
+        built = []
+        for source in sorted(AVATAR_DIR.glob("avatar*.gif")):
+            built += build_variants(source, force=options["force"])
+
+        for path in built:
+            self.stdout.write(f"  {path.relative_to(AVATAR_DIR)} ({path.stat().st_size} bytes)")
+        self.stdout.write(self.style.SUCCESS(f"{len(built)} avatar variants written to {VARIANT_DIR}"))
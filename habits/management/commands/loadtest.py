@@ -0,0 +1,241 @@
+import http.client
+import logging
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.signals import got_request_exception
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from habits.models import Habit
+from habits.sharding import use_user_shard
+
+
+USERNAME_PREFIX = "loadtest_"
+
+# action name → (method, url name)
+ACTIONS = {
+    "dashboard_get": ("GET", "dashboard"),
+    "dashboard_post": ("POST", "dashboard"),
+    "heatmap": ("GET", "heatmap"),
+    "monthly_chart": ("GET", "monthly_chart"),
+    "daily_chart": ("GET", "daily_chart_data"),
+}
+
+DEFAULT_MIX = "dashboard_get=40,dashboard_post=30,heatmap=10,monthly_chart=10,daily_chart=10"
+
+LOCKED = "database is locked"
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class VirtualUser:
+    def __init__(self, user, habit_ids):
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+
+        self.session = session
+        self.habit_ids = habit_ids
+        self.csrf_token = get_random_string(32)
+        self.cookie = (
+            f"{settings.SESSION_COOKIE_NAME}={session.session_key}; "
+            f"{settings.CSRF_COOKIE_NAME}={self.csrf_token}"
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent dashboard/heatmap/chart traffic at the app and report "
+        "throughput, latency percentiles, errors and SQLite lock failures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Target a running server instead of an in-process one.")
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--habits", type=int, default=5)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run.")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma separated action=weight pairs.")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--cleanup", action="store_true", help="Delete the load-test users afterwards.")
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options["mix"])
+        users = self.setup_users(options["users"], options["habits"])
+
+        exceptions = defaultdict(int)
+        server = None
+
+        if options["url"]:
+            parts = urlsplit(options["url"])
+            host, port = parts.hostname, parts.port or 80
+        else:
+            server = self.start_server()
+            host, port = server.server_address[:2]
+
+            def count_exception(sender, request=None, **kwargs):
+                exc = sys.exc_info()[1]
+                exceptions["locked" if exc and LOCKED in str(exc) else type(exc).__name__] += 1
+
+            got_request_exception.connect(count_exception, weak=False)
+
+        self.stdout.write(
+            f"Running {options['threads']} threads for {options['duration']:.0f}s "
+            f"against {host}:{port} with {len(users)} users"
+        )
+
+        quiet = [logging.getLogger(name) for name in ("django.request", "django.server")]
+        levels = [logger.level for logger in quiet]
+        for logger in quiet:
+            logger.setLevel(logging.CRITICAL)
+
+        try:
+            results = self.drive(host, port, users, mix, options)
+        finally:
+            for logger, level in zip(quiet, levels):
+                logger.setLevel(level)
+            if server:
+                got_request_exception.disconnect(count_exception)
+                server.shutdown()
+                server.server_close()
+            for vu in users:
+                vu.session.delete()
+            if options["cleanup"]:
+                User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+        self.report(results, options["duration"], exceptions)
+
+    def parse_mix(self, spec):
+        mix = {}
+        for part in spec.split(","):
+            name, _, weight = part.partition("=")
+            name = name.strip()
+            if name not in ACTIONS:
+                raise CommandError(f"Unknown action '{name}'. Choose from: {', '.join(ACTIONS)}")
+            mix[name] = float(weight or 1)
+        return mix
+
+    def setup_users(self, n_users, n_habits):
+        users = []
+        for i in range(n_users):
+            user, _ = User.objects.get_or_create(username=f"{USERNAME_PREFIX}{i}")
+            with use_user_shard(user.pk):
+                habit_ids = list(Habit.objects.filter(user=user).values_list("id", flat=True))
+                if len(habit_ids) < n_habits:
+                    new = Habit.objects.bulk_create(
+                        [Habit(user=user, name=f"Load habit {j}") for j in range(len(habit_ids), n_habits)]
+                    )
+                    habit_ids += [habit.id for habit in new]
+            users.append(VirtualUser(user, habit_ids))
+        return users
+
+    def start_server(self):
+        server = ThreadedWSGIServer(("127.0.0.1", 0), QuietRequestHandler, allow_reuse_address=True)
+        server.set_app(WSGIHandler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def drive(self, host, port, users, mix, options):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        paths = {name: reverse(url_name) for name, (_, url_name) in ACTIONS.items()}
+        deadline = time.monotonic() + options["duration"]
+        base_seed = options["seed"] if options["seed"] is not None else random.randrange(1 << 30)
+
+        def worker(index):
+            rng = random.Random(base_seed + index)
+            samples = []
+            while time.monotonic() < deadline:
+                action = rng.choices(names, weights)[0]
+                vu = rng.choice(users)
+                samples.append((action, *self.request(host, port, vu, action, paths[action], rng)))
+            return samples
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            return [s for samples in pool.map(worker, range(options["threads"])) for s in samples]
+
+    def request(self, host, port, vu, action, path, rng):
+        method = ACTIONS[action][0]
+        headers = {"Cookie": vu.cookie}
+        body = None
+
+        if method == "POST":
+            fields = [("csrfmiddlewaretoken", vu.csrf_token)]
+            for habit_id in vu.habit_ids:
+                fields.append(("visible", habit_id))
+                if rng.random() < 0.5:
+                    fields.append((f"habit_{habit_id}", "on"))
+            body = urlencode(fields)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            content = response.read()
+            status = response.status
+            if status == 302 and settings.LOGIN_URL in (response.getheader("Location") or ""):
+                status = 401
+        except OSError:
+            status, content = 0, b""
+        finally:
+            conn.close()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        return status, elapsed, status >= 500 and LOCKED.encode() in content
+
+    def report(self, results, duration, exceptions):
+        if not results:
+            self.stdout.write("No requests completed.")
+            return
+
+        by_action = defaultdict(list)
+        for sample in results:
+            by_action[sample[0]].append(sample)
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'action':<16}{'reqs':>7}{'errors':>8}{'locked':>8}"
+            f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+        )
+        for action, samples in sorted(by_action.items()):
+            self.stdout.write(self.format_row(action, samples))
+        self.stdout.write(self.format_row("TOTAL", results))
+
+        self.stdout.write("")
+        self.stdout.write(f"Throughput: {len(results) / duration:.1f} req/s")
+        if exceptions:
+            self.stdout.write(
+                "Server exceptions: " + ", ".join(f"{k}={v}" for k, v in sorted(exceptions.items()))
+            )
+
+    def format_row(self, label, samples):
+        latencies = sorted(s[2] for s in samples)
+        errors = sum(1 for s in samples if s[1] == 0 or s[1] >= 400)
+        locked = sum(1 for s in samples if s[3])
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+        return (
+            f"{label:<16}{len(samples):>7}{errors:>8}{locked:>8}"
+            f"{cuts[49]:>10.1f}{cuts[89]:>10.1f}{cuts[98]:>10.1f}{latencies[-1]:>10.1f}"
+        )
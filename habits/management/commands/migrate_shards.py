@@ -0,0 +1,13 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from habits.sharding import shard_aliases
+
+
+class Command(BaseCommand):
+    help = "Run migrate on the default database and every habit shard."
+
+    def handle(self, *args, **options):
+        for alias in shard_aliases():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Migrating {alias}"))
+            call_command("migrate", database=alias, interactive=False, verbosity=options["verbosity"])
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from habits.deletion import purge_habits, purge_users
+from habits.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Permanently remove soft-deleted habits (with their logs) and "
+        "accounts, in small batches on every shard."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=0,
+            help="Only purge what was deleted at least this many days ago.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per DELETE.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        totals = {"HabitLog": 0, "HabitLogArchive": 0, "Habit": 0}
+        users = 0
+
+        for alias in shard_aliases():
+            with use_shard(alias):
+                for model, n in purge_habits(cutoff, options["batch_size"]).items():
+                    totals[model] += n
+                users += purge_users(cutoff)
+
+        summary = ", ".join(f"{n} {model}" for model, n in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Purged {summary}, {users} accounts"))
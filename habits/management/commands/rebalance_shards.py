@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+
+from habits.middleware import user_cache_key
+from habits.models import (
+    ChallengeMembership, Habit, HabitLog, HabitLogArchive, UserAchievement, UserProfile,
+)
+from habits.sharding import shard_aliases, shard_for_user
+
+
+def copy_row(obj, **overrides):
+    """Unsaved copy of obj without its primary key."""
+    values = {
+        field.attname: getattr(obj, field.attname)
+        for field in obj._meta.concrete_fields
+        if not field.primary_key
+    }
+    values.update(overrides)
+    return type(obj)(**values)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move every user's habit data to the shard HABITS_SHARD_COUNT now "
+        "assigns it to. Run it right after migrate_shards when the shard "
+        "count changes, ideally with the site in maintenance mode. Each user "
+        "is copied in one transaction and removed from the old shard in "
+        "another, so a crash in between leaves a duplicate copy to clean up "
+        "by hand, never a lost one. When shrinking, pass --old-count so the "
+        "retired shard files are drained too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report who would move.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per insert.")
+        parser.add_argument("--old-count", type=int, default=0, help="Previous HABITS_SHARD_COUNT, when shrinking.")
+
+    def handle(self, *args, **options):
+        moved = 0
+        for source in shard_aliases() + self.retired_shards(options["old_count"]):
+            user_ids = set(Habit.all_objects.using(source).values_list("user_id", flat=True))
+            user_ids |= set(UserProfile.objects.using(source).values_list("user_id", flat=True))
+
+            for user_id in sorted(user_ids):
+                target = shard_for_user(user_id)
+                if target == source:
+                    continue
+                self.stdout.write(f"User {user_id}: {source} -> {target}")
+                if not options["dry_run"]:
+                    self.move_user(user_id, source, target, options["batch_size"])
+                    cache.delete(user_cache_key(user_id))
+                moved += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{moved} users rebalanced"))
+
+    def retired_shards(self, old_count):
+        # Shards beyond HABITS_SHARD_COUNT are no longer in DATABASES
+        aliases = []
+        for i in range(len(shard_aliases()), old_count):
+            alias = f"shard_{i}"
+            connections.settings[alias] = {
+                **connections.settings[DEFAULT_DB_ALIAS],
+                "NAME": settings.BASE_DIR / f"db_shard_{i}.sqlite3",
+            }
+            aliases.append(alias)
+        return aliases
+
+    def move_user(self, user_id, source, target, batch_size):
+        with transaction.atomic(using=source):
+            with transaction.atomic(using=target), \
+                    transaction.atomic(using=router.db_for_write(ChallengeMembership)):
+                habit_ids = self.copy_user(user_id, source, target, batch_size)
+                self.remap_memberships(user_id, habit_ids)
+
+            UserAchievement.objects.using(source).filter(user_id=user_id).delete()
+            Habit.all_objects.using(source).filter(user_id=user_id).delete()  # cascades to logs
+            UserProfile.objects.using(source).filter(user_id=user_id).delete()
+
+    def copy_user(self, user_id, source, target, batch_size):
+        profile = UserProfile.objects.using(source).filter(user_id=user_id).first()
+        if profile is not None:
+            # A request may already have created an empty profile on the target
+            UserProfile.objects.using(target).filter(user_id=user_id).delete()
+            UserProfile.objects.using(target).bulk_create([copy_row(profile)])
+
+        # Habit ids are per shard, so habits get new ids on the target
+        old_habits = list(Habit.all_objects.using(source).filter(user_id=user_id).order_by("id"))
+        new_habits = Habit.all_objects.using(target).bulk_create([copy_row(h) for h in old_habits])
+        habit_ids = {old.id: new.id for old, new in zip(old_habits, new_habits)}
+
+        for model in (HabitLog, HabitLogArchive):
+            rows = model.all_objects.using(source).filter(habit_id__in=habit_ids).iterator(chunk_size=batch_size)
+            model.all_objects.using(target).bulk_create(
+                (copy_row(row, habit_id=habit_ids[row.habit_id]) for row in rows),
+                batch_size=batch_size,
+            )
+
+        UserAchievement.objects.using(target).bulk_create(
+            [
+                copy_row(a, habit_id=habit_ids.get(a.habit_id))
+                for a in UserAchievement.objects.using(source).filter(user_id=user_id)
+            ],
+            ignore_conflicts=True,
+        )
+        return habit_ids
+
+    def remap_memberships(self, user_id, habit_ids):
+        # Memberships are central and point at the habit's per-shard id
+        memberships = list(ChallengeMembership.objects.filter(user_id=user_id, habit_id__in=habit_ids))
+        for membership in memberships:
+            membership.habit_id = habit_ids[membership.habit_id]
+        ChallengeMembership.objects.bulk_update(memberships, ["habit_id"])
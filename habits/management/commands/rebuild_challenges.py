@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from habits.challenges import rebuild
+from habits.models import Challenge
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute challenge progress from the members' logs and archive, e.g. after "
+        "archive_logs, purge_deleted or a bulk import, which skip the "
+        "incremental updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("challenge_ids", nargs="*", type=int, help="Default: all challenges.")
+
+    def handle(self, *args, **options):
+        challenges = Challenge.objects.all()
+        if options["challenge_ids"]:
+            challenges = challenges.filter(id__in=options["challenge_ids"])
+
+        for challenge in challenges:
+            rebuild(challenge)
+            self.stdout.write(f"Rebuilt {challenge}")
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,184 @@
+import calendar
+import json
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from habits.archive import archive_dates, archive_horizon
+from habits.models import Habit, HabitLog, HabitLogArchive, UserProfile
+from habits.sharding import group_by_shard, use_shard
+from habits.utils import render_monthly_chart
+
+
+def render_report(job):
+    # Runs in a worker process: pure rendering, no database access
+    user_id, daily_count, title = job
+    return user_id, render_monthly_chart(daily_count, title=title)
+
+
+def parse_month(value):
+    try:
+        year, month = map(int, value.split("-"))
+        return date(year, month, 1)
+    except ValueError:
+        raise CommandError(f"Invalid month '{value}', expected YYYY-MM")
+
+
+class Command(BaseCommand):
+    help = (
+        "Render every user's monthly progress chart and summary, a chunk of "
+        "users at a time across a process pool. Safe to re-run after an "
+        "interruption: finished users are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="YYYY-MM (default: last month).")
+        parser.add_argument("--output", default="reports", help="Directory for reports and progress.")
+        parser.add_argument("--email", action="store_true", help="Also email each report through EMAIL_BACKEND.")
+        parser.add_argument("--chunk-size", type=int, default=200)
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--restart", action="store_true", help="Ignore saved progress.")
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            first = parse_month(options["month"])
+        else:
+            first = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+        last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+        out_dir = Path(options["output"]) / first.strftime("%Y-%m")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        checkpoint = out_dir / ".checkpoint"
+
+        last_pk = 0
+        if checkpoint.exists() and not options["restart"]:
+            last_pk = int(checkpoint.read_text() or 0)
+            self.stdout.write(f"Resuming after user {last_pk}")
+
+        mail = get_connection() if options["email"] else None
+        done = 0
+
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                users = list(
+                    User.objects.filter(pk__gt=last_pk, is_active=True).order_by("pk")
+                    .values("pk", "username", "email")[:options["chunk_size"]]
+                )
+                if not users:
+                    break
+
+                reports = self.collect(users, first, last)
+                jobs = [
+                    (pk, report["daily"], f"{report['username']} – {first:%B %Y}")
+                    for pk, report in reports.items()
+                ]
+                charts = dict(pool.map(render_report, jobs, chunksize=8))
+
+                self.deliver(reports, charts, out_dir, mail, first)
+
+                last_pk = users[-1]["pk"]
+                tmp = checkpoint.with_suffix(".tmp")
+                tmp.write_text(str(last_pk))
+                tmp.replace(checkpoint)
+
+                done += len(reports)
+                self.stdout.write(f"{done} reports rendered")
+
+        self.stdout.write(self.style.SUCCESS(f"Finished {first:%Y-%m}: {done} reports in {out_dir}"))
+
+    def collect(self, users, first, last):
+        """Summary + daily counts for a chunk of users, in a handful of grouped queries per shard."""
+        days = (last - first).days + 1
+        reports = {
+            u["pk"]: {"username": u["username"], "email": u["email"], "daily": [0] * days}
+            for u in users
+        }
+        for alias, ids in group_by_shard(reports).items():
+            with use_shard(alias):
+                self.collect_shard(reports, ids, first, last, days)
+        return reports
+
+    def collect_shard(self, reports, ids, first, last, days):
+        # Active habits, live + archived logs: the same counts as completion_counts
+        logs = HabitLog.objects.filter(
+            habit__user_id__in=ids, habit__archived=False, completed=True, date__range=(first, last),
+        )
+        for user_id, day, n in logs.values_list("habit__user_id", "date").annotate(n=Count("id")):
+            reports[user_id]["daily"][day.day - 1] = n
+
+        per_habit = defaultdict(Counter)
+        for user_id, name, n in logs.values_list("habit__user_id", "habit__name").annotate(n=Count("id")):
+            per_habit[user_id][name] += n
+
+        if first < archive_horizon():
+            archives = HabitLogArchive.objects.filter(
+                habit__user_id__in=ids, habit__archived=False, year=first.year,
+            ).select_related("habit")
+            for archive in archives:
+                report = reports[archive.habit.user_id]
+                for day in archive_dates(archive):
+                    if first <= day <= last:
+                        report["daily"][day.day - 1] += 1
+                        per_habit[archive.habit.user_id][archive.habit.name] += 1
+
+        habit_counts = dict(
+            Habit.objects.filter(user_id__in=ids).active().values_list("user_id").annotate(n=Count("id"))
+        )
+        top_habits = {user_id: counts.most_common(1)[0][0] for user_id, counts in per_habit.items()}
+
+        profiles = {p.user_id: p for p in UserProfile.objects.filter(user_id__in=ids)}
+
+        for user_id in ids:
+            report = reports[user_id]
+            total_habits = habit_counts.get(user_id, 0)
+            completions = sum(report["daily"])
+            profile = profiles.get(user_id)
+            report["summary"] = {
+                "month": first.strftime("%Y-%m"),
+                "total_habits": total_habits,
+                "completions": completions,
+                "success_rate": int(completions / (total_habits * days) * 100) if total_habits else 0,
+                "active_days": sum(1 for n in report["daily"] if n),
+                "top_habit": top_habits.get(user_id),
+                "xp": profile.xp if profile else 0,
+                "level": profile.level if profile else 1,
+                "current_streak": profile.current_streak if profile else 0,
+                "best_streak": profile.best_streak if profile else 0,
+            }
+
+    def deliver(self, reports, charts, out_dir, mail, first):
+        messages = []
+        for user_id, report in reports.items():
+            png = charts[user_id]
+            (out_dir / f"{user_id}.png").write_bytes(png)
+            (out_dir / f"{user_id}.json").write_text(json.dumps(report["summary"], indent=2))
+
+            if mail and report["email"]:
+                summary = report["summary"]
+                message = EmailMessage(
+                    subject=f"Your habit report for {first:%B %Y}",
+                    body=(
+                        f"Hi {report['username']},\n\n"
+                        f"Completions: {summary['completions']} "
+                        f"({summary['success_rate']}% of possible)\n"
+                        f"Active days: {summary['active_days']}\n"
+                        f"Top habit: {summary['top_habit'] or '—'}\n"
+                        f"Level {summary['level']} · {summary['xp']} XP · "
+                        f"best streak {summary['best_streak']} days\n"
+                    ),
+                    to=[report["email"]],
+                    connection=mail,
+                )
+                message.attach(f"habits-{first:%Y-%m}.png", png, "image/png")
+                messages.append(message)
+
+        if messages:
+            mail.send_messages(messages)
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.archive import restore_logs
+from habits.models import Habit
+from habits.sharding import shard_aliases, shard_for_user, use_shard
+
+
+class Command(BaseCommand):
+    help = "Move archived logs for a user (or a single habit) back into HabitLog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username whose habits to restore.")
+        parser.add_argument("--habit", type=int, help="Restore a single habit by id.")
+        parser.add_argument("--year", type=int, help="Only restore this year.")
+
+    def handle(self, *args, **options):
+        if not options["user"] and not options["habit"]:
+            raise CommandError("Pass --user or --habit")
+
+        lookup = {}
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named '{options['user']}'")
+            lookup["user"] = user
+            shard = shard_for_user(user.pk)
+        if options["habit"]:
+            lookup["id"] = options["habit"]
+            if not options["user"]:
+                # Habit ids are only unique within a shard
+                shards = [
+                    alias for alias in shard_aliases()
+                    if Habit.objects.using(alias).filter(id=options["habit"]).exists()
+                ]
+                if len(shards) != 1:
+                    raise CommandError(
+                        f"Habit {options['habit']} found on {len(shards)} shards; add --user"
+                    )
+                shard = shards[0]
+
+        with use_shard(shard):
+            restored = restore_logs(Habit.objects.filter(**lookup), year=options["year"])
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} logs"))
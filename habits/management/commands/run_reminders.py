@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from habits.reminders import claim_due, open_habit_counts, peek_due, reminder_message
+from habits.sharding import shard_aliases, use_shard
+
+
+class Command(BaseCommand):
+    help = (
+        "Email users whose reminder time has passed and who still have open "
+        "habits for their local day. Meant to run every few minutes from cron; "
+        "each run only reads the profiles that are due."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Profiles claimed per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Count due reminders without claiming or sending them.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        mail = get_connection()
+        claimed = sent = 0
+
+        for alias in shard_aliases():
+            with use_shard(alias):
+                for due in self.batches(now, options["batch_size"], options["dry_run"]):
+                    claimed += len(due)
+                    messages = self.messages(due, now, mail)
+                    if messages and not options["dry_run"]:
+                        mail.send_messages(messages)
+                    sent += len(messages)
+
+        verb = "would be sent" if options["dry_run"] else "sent"
+        self.stdout.write(self.style.SUCCESS(f"{claimed} reminders due, {sent} {verb}"))
+
+    def batches(self, now, batch_size, dry_run):
+        if dry_run:
+            yield from peek_due(now, batch_size)
+            return
+        while True:
+            due = claim_due(now, batch_size)
+            if not due:
+                return
+            yield due
+
+    def messages(self, profiles, now, mail):
+        open_counts = open_habit_counts(profiles, now)
+        waiting = {user_id for user_id, (_, remaining) in open_counts.items() if remaining > 0}
+        users = User.objects.filter(pk__in=waiting, is_active=True).exclude(email="").only("username", "email")
+        return [
+            reminder_message(user, *open_counts[user.pk], connection=mail)
+            for user in users
+        ]
@@ -0,0 +1,111 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .models import UserProfile
+from .utils import get_zone
+
+
+USER_CACHE_TIMEOUT = getattr(settings, "HABITS_USER_CACHE_TIMEOUT", 300)
+
+
+def user_cache_key(user_id):
+    return f"habits:user:{user_id}"
+
+
+def _load_user(request):
+    # Same checks as auth.get_user(), but the user (with its profile
+    # already attached) comes from the cache instead of two SELECTs.
+    try:
+        user_id = request.session[SESSION_KEY]
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    key = user_cache_key(user_id)
+    user = cache.get(key)
+
+    if user is not None:
+        session_hash = request.session.get(HASH_SESSION_KEY)
+        if session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash()
+        ):
+            return user
+
+    # Cache miss or hash mismatch → let Django verify (and flush) the session
+    user = auth.get_user(request)
+
+    if user.is_authenticated:
+        try:
+            user.userprofile
+        except UserProfile.DoesNotExist:
+            pass
+        cache.set(key, user, USER_CACHE_TIMEOUT)
+
+    return user
+
+
+def get_cached_user(request):
+    if not hasattr(request, "_cached_user"):
+        request._cached_user = _load_user(request)
+    return request._cached_user
+
+
+async def aget_cached_user(request):
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await sync_to_async(get_cached_user)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Drop-in replacement for AuthenticationMiddleware that serves the
+    logged-in user and their UserProfile from the cache.
+
+    Entries are invalidated from habits.signals whenever a User or
+    UserProfile is saved or deleted.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+        request.auser = partial(aget_cached_user, request)
+
+
+class UserTimezoneMiddleware:
+    """
+    Activate the logged-in user's UserProfile.timezone for the request,
+    so timezone.localdate() and template dates are in their local day.
+    The profile comes with the cached user: no query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        zone = None
+        if request.user.is_authenticated:
+            try:
+                zone = get_zone(request.user.userprofile.timezone)
+            except UserProfile.DoesNotExist:
+                pass
+
+        if zone is None:
+            return self.get_response(request)
+
+        timezone.activate(zone)
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0007_alter_userprofile_avatar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('bitmap', models.BinaryField()),
+                ('completed_days', models.PositiveSmallIntegerField(default=0)),
+                ('habit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='habits.habit')),
+            ],
+            options={
+                'unique_together': {('habit', 'year')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def number_existing_habits(apps, schema_editor):
+    # Keep today's creation order as the initial manual order
+    Habit = apps.get_model('habits', 'Habit')
+    Habit.objects.using(schema_editor.connection.alias).update(position=F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0010_userachievement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='habit',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # The hint lets UserShardRouter run it on every shard, not just default
+        migrations.RunPython(
+            number_existing_habits, migrations.RunPython.noop, hints={'model_name': 'habit'},
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['user', 'position', 'id'], name='habit_active_order_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:41
+
+from django.db import migrations, models
+
+
+def fix_missing_default(apps, schema_editor):
+    # avatar1.png never existed; the shipped avatars are GIFs
+    UserProfile = apps.get_model('habits', 'UserProfile')
+    UserProfile.objects.using(schema_editor.connection.alias).filter(
+        avatar='avatar1.png'
+    ).update(avatar='avatar1.gif')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0013_userprofile_reminders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.CharField(default='avatar1.gif', max_length=100),
+        ),
+        # The hint lets UserShardRouter run it on every shard, not just default
+        migrations.RunPython(
+            fix_missing_default, migrations.RunPython.noop, hints={'model_name': 'userprofile'},
+        ),
+    ]
@@ -1,12 +1,55 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
+class HabitQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(archived=False)
+
+
+class HabitManager(models.Manager.from_queryset(HabitQuerySet)):
+    # Deleted habits wait for purge_deleted; only all_objects sees them
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class LiveHabitDataManager(models.Manager):
+    # Rows of deleted habits are invisible until purge_deleted removes them
+    def get_queryset(self):
+        return super().get_queryset().filter(habit__deleted_at__isnull=True)
+
+
 class Habit(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='habits')
+    # Users live in the central DB, habits may live on a shard
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='habits', db_constraint=False)
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+    archived = models.BooleanField(default=False)
+    position = models.PositiveIntegerField(default=0)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = HabitManager()
+    all_objects = HabitQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Dashboard pages walk this in (position, id) order; archived
+            # and deleted habits are left out so they cost nothing however
+            # many pile up.
+            models.Index(
+                fields=['user', 'position', 'id'],
+                condition=models.Q(archived=False, deleted_at__isnull=True),
+                name='habit_active_order_idx',
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='habit_deleted_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -16,12 +59,26 @@ class HabitLog(models.Model):
     date = models.DateField()
     completed = models.BooleanField(default=False)
 
+    objects = LiveHabitDataManager()
+    all_objects = models.Manager()
+
     class Meta:
         unique_together = ('habit', 'date')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored state, so post_save can tell whether `completed` flipped
+        instance._loaded_completed = instance.completed if 'completed' in field_names else None
+        return instance
+
+
+def default_timezone():
+    return settings.TIME_ZONE
+
 
 class UserProfile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, db_constraint=False)
     xp = models.IntegerField(default=0)
     level = models.IntegerField(default=1)
     current_streak = models.IntegerField(default=0)
@@ -30,8 +87,129 @@ class UserProfile(models.Model):
 
     avatar = models.CharField(
         max_length=100,
-        default="avatar1.png"
+        default="avatar1.gif"
     )
 
+    # Daily reminder at reminder_time in the user's timezone; run_reminders
+    # picks up profiles whose next_reminder_at has passed.
+    reminder_time = models.TimeField(null=True, blank=True)
+    timezone = models.CharField(max_length=64, default=default_timezone)
+    next_reminder_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Set when the account is deleted; purge_deleted removes it later
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_reminder_at'],
+                name='profile_due_reminder_idx',
+                condition=models.Q(next_reminder_at__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return self.user.username
+
+
+class HabitLogArchive(models.Model):
+    # One row per habit per year for logs moved out of HabitLog
+    # (see habits.archive). bitmap is a zlib-compressed bit per day of year.
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name='archives')
+    year = models.PositiveSmallIntegerField()
+    bitmap = models.BinaryField()
+    completed_days = models.PositiveSmallIntegerField(default=0)
+
+    objects = LiveHabitDataManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        unique_together = ('habit', 'year')
+
+
+class RequestProfile(models.Model):
+    # Index of profiles captured by habits.profiling; the cProfile dump and
+    # SQL list live on disk under HABITS_PROFILE_DIR.
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=100, db_index=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_time_ms = models.FloatField()
+    file_stem = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class UserAchievement(models.Model):
+    # Badges awarded by habits.achievements; code identifies the rule
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='achievements', db_constraint=False)
+    code = models.CharField(max_length=50)
+    habit = models.ForeignKey(Habit, on_delete=models.SET_NULL, null=True, blank=True)
+    awarded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'code')
+        ordering = ['awarded_at']
+
+    def __str__(self):
+        return f"{self.user} – {self.code}"
+
+
+class Challenge(models.Model):
+    # Shared goal for a group of users; lives in the central DB next to
+    # auth, since its members can be on any shard.
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    # Purging the owner's account must not take the challenge from its members
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='owned_challenges')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-start_date', '-id']
+
+    @property
+    def length(self):
+        return (self.end_date - self.start_date).days + 1
+
+    def __str__(self):
+        return self.name
+
+
+class ChallengeMembership(models.Model):
+    # completed_days is kept up to date by habits.challenges as the linked
+    # habit's logs change, so the board never reads HabitLog.
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='challenge_memberships')
+    # The habit lives on the member's shard: no constraint, never joined
+    habit = models.ForeignKey(Habit, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    joined_at = models.DateTimeField(auto_now_add=True)
+    completed_days = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('challenge', 'user')
+        indexes = [
+            models.Index(fields=['user', 'habit'], name='membership_user_habit_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.challenge}"
+
+
+class ChallengeDay(models.Model):
+    # Materialized per-day progress: members whose habit was completed
+    challenge = models.ForeignKey(Challenge, on_delete=models.CASCADE, related_name='days')
+    date = models.DateField()
+    completed_members = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('challenge', 'date')
+        ordering = ['date']
@@ -0,0 +1,120 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from .models import RequestProfile
+
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAM = "_profile"
+
+
+def profile_dir():
+    return Path(getattr(settings, "HABITS_PROFILE_DIR", settings.BASE_DIR / "profiles"))
+
+
+def profile_keep():
+    return getattr(settings, "HABITS_PROFILE_KEEP", 100)
+
+
+def load_stats(profile, limit=30):
+    """Top functions by cumulative time, as pstats prints them."""
+    out = io.StringIO()
+    stats = pstats.Stats(str(profile_dir() / f"{profile.file_stem}.prof"), stream=out)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def load_queries(profile):
+    with open(profile_dir() / f"{profile.file_stem}.json") as fh:
+        return json.load(fh)
+
+
+def delete_files(profile):
+    for suffix in (".prof", ".json"):
+        (profile_dir() / f"{profile.file_stem}{suffix}").unlink(missing_ok=True)
+
+
+def rotate():
+    stale = RequestProfile.objects.all()[profile_keep():]
+    for profile in stale:
+        delete_files(profile)
+    RequestProfile.objects.filter(pk__in=[p.pk for p in stale]).delete()
+
+
+class RequestProfilerMiddleware:
+    """
+    Profile a single request on demand: staff send an ``X-Profile: 1``
+    header or a ``?_profile=1`` query param.
+
+    Every other request only pays for two dict lookups, and with
+    HABITS_PROFILER_ENABLED = False the middleware unloads itself.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "HABITS_PROFILER_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if PROFILE_HEADER not in request.META and PROFILE_PARAM not in request.GET:
+            return self.get_response(request)
+        if not request.user.is_staff:
+            return self.get_response(request)
+        return self.profile(request)
+
+    def profile(self, request):
+        profiler = cProfile.Profile()
+
+        with ExitStack() as stack:
+            captures = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in connections
+            ]
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - start) * 1000
+
+        queries = [
+            {"db": capture.connection.alias, **query}
+            for capture in captures
+            for query in capture.captured_queries
+        ]
+
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(directory / f"{stem}.prof")
+        with open(directory / f"{stem}.json", "w") as fh:
+            json.dump(queries, fh, indent=1)
+
+        match = request.resolver_match
+        profile = RequestProfile.objects.create(
+            user=request.user,
+            method=request.method,
+            path=request.path[:255],
+            view_name=match.view_name if match else "",
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            query_count=len(queries),
+            query_time_ms=sum(float(q["time"]) for q in queries) * 1000,
+            file_stem=stem,
+        )
+        rotate()
+
+        response["X-Profile-Id"] = str(profile.pk)
+        return response
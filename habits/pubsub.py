@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InProcessBroker:
+    """
+    Fan-out of per-user progress events to the SSE streams connected to
+    this process.
+
+    Any class with the same subscribe / unsubscribe / publish methods can
+    be plugged in through HABITS_PUBSUB_BACKEND (e.g. one backed by a
+    local Redis so every worker sees every event).
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        # Must be called from the event loop that will consume the queue
+        queue = asyncio.Queue(maxsize=self.max_queue)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers[user_id].add((loop, queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id, event, data):
+        # Safe to call from any thread (sync views run in a thread pool)
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, (event, data))
+            except RuntimeError:
+                # Loop already closed; the stream's finally will unsubscribe
+                pass
+
+
+def _offer(queue, item):
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        # Slow client: drop the event, the next one carries fresh state
+        pass
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    backend = getattr(settings, "HABITS_PUBSUB_BACKEND", "habits.pubsub.InProcessBroker")
+    return import_string(backend)()
@@ -0,0 +1,110 @@
+"""
+Daily reminders for users with habits still open for their local day.
+
+Each profile with a reminder_time carries the next moment it is due in
+next_reminder_at (indexed), so a run_reminders tick only ever touches
+the profiles that are due, however many users there are.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import router, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .middleware import user_cache_key
+from .models import Habit, HabitLog, UserProfile
+
+
+def next_reminder_at(profile, after=None):
+    """First occurrence of the profile's reminder_time strictly after `after`."""
+    if profile.reminder_time is None:
+        return None
+    tz = ZoneInfo(profile.timezone)
+    local = (after or timezone.now()).astimezone(tz)
+    due = datetime.combine(local.date(), profile.reminder_time, tzinfo=tz)
+    if due <= local:
+        due = datetime.combine(local.date() + timedelta(days=1), profile.reminder_time, tzinfo=tz)
+    return due
+
+
+def due_profiles(now):
+    return (
+        UserProfile.objects.filter(next_reminder_at__lte=now)
+        .only("id", "user_id", "reminder_time", "timezone", "next_reminder_at")
+    )
+
+
+def claim_due(now, batch_size):
+    """
+    Take up to batch_size due profiles on the current shard and move
+    them on to their next reminder, in one write transaction so two
+    concurrent runs never claim the same row.
+    """
+    with transaction.atomic(using=router.db_for_write(UserProfile)):
+        due = list(due_profiles(now).order_by("next_reminder_at")[:batch_size])
+        for profile in due:
+            profile.next_reminder_at = next_reminder_at(profile, now)
+        UserProfile.objects.bulk_update(due, ["next_reminder_at"])
+    # bulk_update skips post_save, so drop the cached users by hand
+    cache.delete_many([user_cache_key(p.user_id) for p in due])
+    return due
+
+
+def peek_due(now, batch_size):
+    """
+    Batches of due profiles on the current shard, like claim_due but
+    read only: nothing is moved on, so a dry run skips no reminders.
+    """
+    last_id = 0
+    while True:
+        due = list(due_profiles(now).filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not due:
+            return
+        yield due
+        last_id = due[-1].id
+
+
+def open_habit_counts(profiles, now):
+    """{user_id: (local date, habits not yet completed that day)} for a batch."""
+    local_days = {
+        p.user_id: now.astimezone(ZoneInfo(p.timezone)).date()
+        for p in profiles
+    }
+
+    active = dict(
+        Habit.objects.filter(user_id__in=local_days).active()
+        .values_list("user_id").annotate(n=Count("id"))
+    )
+
+    completed = defaultdict(int)
+    for user_id, day, n in (
+        HabitLog.objects.filter(
+            habit__user_id__in=local_days, habit__archived=False,
+            completed=True, date__in=set(local_days.values()),
+        )
+        .values_list("habit__user_id", "date").annotate(n=Count("id"))
+    ):
+        completed[(user_id, day)] = n
+
+    return {
+        user_id: (day, active.get(user_id, 0) - completed[(user_id, day)])
+        for user_id, day in local_days.items()
+    }
+
+
+def reminder_message(user, day, remaining, connection=None):
+    noun = "habit" if remaining == 1 else "habits"
+    return EmailMessage(
+        subject=f"{remaining} {noun} left for today",
+        body=(
+            f"Hi {user.username},\n\n"
+            f"You still have {remaining} {noun} to complete for {day:%A, %d %B}. "
+            "Keep your streak going! 🔥\n"
+        ),
+        to=[user.email],
+        connection=connection,
+    )
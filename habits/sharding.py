@@ -0,0 +1,119 @@
+"""
+Per-user SQLite sharding.
+
+Each user's habit data (the models in SHARDED_MODELS) lives in one of
+HABITS_SHARD_COUNT databases, picked from the user id. Shard 0 is the
+central "default" database, which also keeps auth, sessions, admin and
+everything else, so a single shard behaves exactly like no sharding.
+
+Queries that carry a model instance are routed from it. Plain manager
+queries (Habit.objects.filter(...)) go to the shard of the current
+request's user, set by ShardMiddleware, or of whatever use_shard() /
+use_user_shard() block is active in commands.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+
+
+SHARDED_MODELS = {
+    "habits.habit",
+    "habits.habitlog",
+    "habits.habitlogarchive",
+    "habits.userprofile",
+    "habits.userachievement",
+}
+
+_current_shard = ContextVar("habits_current_shard", default=None)
+
+
+def shard_aliases():
+    count = getattr(settings, "HABITS_SHARD_COUNT", 1)
+    return [DEFAULT_DB_ALIAS] + [f"shard_{i}" for i in range(1, count)]
+
+
+def shard_for_user(user_id):
+    aliases = shard_aliases()
+    return aliases[int(user_id) % len(aliases)]
+
+
+def group_by_shard(user_ids):
+    groups = defaultdict(list)
+    for user_id in user_ids:
+        groups[shard_for_user(user_id)].append(user_id)
+    return groups
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+@contextmanager
+def use_shard(alias):
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def use_user_shard(user_id):
+    return use_shard(shard_for_user(user_id))
+
+
+def _owner_id(instance):
+    if isinstance(instance, get_user_model()):
+        return instance.pk
+    if getattr(instance, "user_id", None):
+        return instance.user_id
+    habit = instance._state.fields_cache.get("habit") if hasattr(instance, "habit_id") else None
+    return habit.user_id if habit is not None else None
+
+
+class UserShardRouter:
+    def _route(self, model, **hints):
+        if not is_sharded(model):
+            return DEFAULT_DB_ALIAS
+
+        instance = hints.get("instance")
+        if instance is not None:
+            owner_id = _owner_id(instance)
+            if owner_id:
+                return shard_for_user(owner_id)
+            if instance._state.db:
+                return instance._state.db
+
+        return current_shard() or DEFAULT_DB_ALIAS
+
+    db_for_read = _route
+    db_for_write = _route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sharded rows point at users in the central DB by design
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS:
+            return None
+        return model_name is not None and f"{app_label}.{model_name}" in SHARDED_MODELS
+
+
+class ShardMiddleware:
+    """Route the request's unhinted queries to the logged-in user's shard."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.user.is_authenticated:
+            return self.get_response(request)
+        with use_user_shard(request.user.pk):
+            return self.get_response(request)
@@ -1,9 +1,112 @@
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .middleware import user_cache_key
+from .models import Habit, HabitLog, UserAchievement, UserProfile
+from .pubsub import get_broker
+from .achievements import queue_log_change, queue_profile_change
+from . import challenges
+from .sharding import shard_for_user, use_user_shard
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance)
\ No newline at end of file
+        with use_user_shard(instance.pk):
+            UserProfile.objects.create(user=instance)
+
+
+# Cached request.user (see CachedAuthenticationMiddleware) must never
+# outlive a change to the user or its profile.
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.pk))
+
+
+# The delete cascade only runs on the central DB; a user whose data
+# lives on another shard has it removed there explicitly.
+@receiver(post_delete, sender=User)
+def delete_sharded_user_data(sender, instance, **kwargs):
+    shard = shard_for_user(instance.pk)
+    if shard == kwargs.get("using", "default"):
+        return
+    for manager in (UserAchievement.objects, Habit.all_objects, UserProfile.objects):
+        manager.using(shard).filter(user_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    cache.delete(user_cache_key(instance.user_id))
+
+
+# Live progress events for the dashboard SSE stream (views.progress_stream).
+# Published after commit so clients never see rolled back state.
+def publish(user_id, event, data):
+    transaction.on_commit(
+        lambda: get_broker().publish(user_id, event, data),
+        using=shard_for_user(user_id),
+    )
+
+
+def completed_delta(log, created):
+    """+1/-1 when this save flipped `completed`, 0 if it didn't, None if unknown."""
+    before = False if created else getattr(log, "_loaded_completed", None)
+    if before is None:
+        return None
+    return int(log.completed) - int(before)
+
+
+@receiver(post_save, sender=HabitLog)
+def publish_log(sender, instance, created, **kwargs):
+    publish(instance.habit.user_id, "log", {
+        "habit": instance.habit_id,
+        "date": instance.date.isoformat(),
+        "completed": instance.completed,
+        "delta": completed_delta(instance, created),
+    })
+
+
+@receiver(post_save, sender=UserProfile)
+def publish_profile(sender, instance, **kwargs):
+    publish(instance.user_id, "profile", {
+        "xp": instance.xp,
+        "level": instance.level,
+        "streak": instance.current_streak,
+    })
+
+
+@receiver(post_save, sender=Habit)
+def publish_habit_added(sender, instance, created, **kwargs):
+    if created:
+        publish(instance.user_id, "habit", {"habit": instance.id, "active": True})
+
+
+@receiver(post_delete, sender=Habit)
+def publish_habit_removed(sender, instance, **kwargs):
+    publish(instance.user_id, "habit", {"habit": instance.id, "active": False})
+
+
+# Achievements: only the rules a change can affect are evaluated
+@receiver(post_save, sender=HabitLog)
+def evaluate_log_achievements(sender, instance, **kwargs):
+    if instance.completed:
+        queue_log_change(instance.habit.user_id, instance.habit_id, instance.date)
+
+
+@receiver(post_save, sender=UserProfile)
+def evaluate_profile_achievements(sender, instance, **kwargs):
+    queue_profile_change(instance)
+
+
+# Team challenges: counters move only when `completed` actually flips.
+# Connected after publish_log, which reads the same stored state.
+@receiver(post_save, sender=HabitLog)
+def update_challenge_progress(sender, instance, created, **kwargs):
+    delta = completed_delta(instance, created)
+    if not delta:
+        return
+    instance._loaded_completed = instance.completed
+    challenges.queue_log_change(instance.habit.user_id, instance.habit_id, instance.date, delta)
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from habits.avatars import available_variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar(name, size, css_class="", alt="Avatar"):
+    """
+    Avatar shown at `size` CSS pixels: the smallest fitting WebP variant
+    where the browser supports it, the original GIF otherwise.
+    """
+    img = format_html(
+        '<img src="{}" width="{}" height="{}" class="{}" alt="{}" decoding="async">',
+        static(f"avatars/{name}"), size, size, css_class, alt,
+    )
+    variants = available_variants(Path(name).stem)
+    if not variants:
+        return img
+
+    srcset = ", ".join(f"{static(path)} {width}w" for width, path in variants)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}px">{}</picture>',
+        srcset, size, img,
+    )
@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+
+# Per-test cache, plain static storage so templates render without a
+# collectstatic manifest, and a fast hasher for the factories. One shard
+# whatever the environment says; test_sharding opts in to two.
+TEST_SETTINGS = {
+    "HABITS_SHARD_COUNT": 1,
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+}
+
+
+@override_settings(**TEST_SETTINGS)
+class HabitTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
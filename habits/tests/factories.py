@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from habits.models import Habit, HabitLog
+
+
+# (habits, days of history) per named size, smallest first
+HISTORY_SIZES = {
+    "new": (3, 0),
+    "small": (3, 7),
+    "medium": (10, 90),
+    "large": (20, 730),
+}
+
+
+def make_user(username="user", password="password", **extra):
+    return User.objects.create_user(username=username, password=password, **extra)
+
+
+def make_habits(user, count, **fields):
+    return Habit.objects.bulk_create([
+        Habit(user=user, name=f"Habit {i}", position=i, **fields)
+        for i in range(count)
+    ])
+
+
+def make_history(habits, days, today=None):
+    """Logs for the last `days` days before today; about two in three completed."""
+    today = today or timezone.localdate()
+    HabitLog.objects.bulk_create(
+        [
+            HabitLog(habit=habit, date=today - timedelta(days=d), completed=(d + i) % 3 != 0)
+            for i, habit in enumerate(habits)
+            for d in range(1, days + 1)
+        ],
+        batch_size=1000,
+    )
+
+
+def make_user_with_history(size, username=None):
+    n_habits, days = HISTORY_SIZES[size]
+    user = make_user(username or f"user_{size}")
+    habits = make_habits(user, n_habits)
+    make_history(habits, days)
+    return user, habits
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+
+
+# Test databases get one extra shard whatever HABITS_SHARD_COUNT is, so
+# tests that opt in (databases = {"default", TEST_SHARD}) can route users
+# to it. Everything else stays on default (see base.TEST_SETTINGS).
+TEST_SHARD = "shard_1"
+
+
+class ShardedTestRunner(DiscoverRunner):
+    def setup_databases(self, **kwargs):
+        if TEST_SHARD not in connections.settings:
+            connections.settings[TEST_SHARD] = {
+                **connections.settings[DEFAULT_DB_ALIAS],
+                "NAME": settings.BASE_DIR / "db_shard_1.sqlite3",
+            }
+        return super().setup_databases(**kwargs)
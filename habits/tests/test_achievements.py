@@ -0,0 +1,35 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from habits.achievements import evaluate_logs
+from habits.models import Habit, HabitLog, UserAchievement
+
+from .base import HabitTestCase
+from .factories import make_habits, make_user
+
+
+class PerfectWeekTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.habit, archived = make_habits(self.user, 2)
+        Habit.objects.filter(id=archived.id).update(archived=True)
+
+        today = timezone.localdate()
+        monday = today - timedelta(days=today.weekday() + 7)
+        self.week = [monday + timedelta(days=d) for d in range(7)]
+        HabitLog.objects.bulk_create([HabitLog(habit=self.habit, date=day, completed=True) for day in self.week])
+
+    def earned(self):
+        return UserAchievement.objects.filter(user=self.user, code="perfect_week").exists()
+
+    def test_archived_habits_do_not_block_a_perfect_week(self):
+        evaluate_logs(self.user.pk, [(self.habit.id, day) for day in self.week])
+        self.assertTrue(self.earned())
+
+    def test_backfill_ignores_archived_habits(self):
+        call_command("backfill_achievements", stdout=StringIO())
+        self.assertTrue(self.earned())
@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from habits import challenges
+from habits.archive import archive_logs
+from habits.deletion import soft_delete_habit
+from habits.models import Challenge, ChallengeDay, ChallengeMembership, HabitLog
+
+from .base import HabitTestCase
+from .factories import make_habits, make_history, make_user
+
+
+class ChallengeProgressTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.owner = make_user("owner")
+        self.challenge = challenges.create_challenge(
+            self.owner, "Meditate", self.today - timedelta(days=9), days=30,
+        )
+        self.user = make_user("member")
+        self.habit, self.other = make_habits(self.user, 2)
+        self.client.force_login(self.user)
+
+    def day(self, date):
+        return ChallengeDay.objects.get(challenge=self.challenge, date=date).completed_members
+
+    def test_join_counts_days_already_completed(self):
+        make_history([self.habit], 20)  # 2 in 3 completed, from yesterday back
+        membership = challenges.join(self.challenge, self.user, self.habit)
+
+        in_window = HabitLog.objects.filter(
+            habit=self.habit, completed=True, date__gte=self.challenge.start_date,
+        ).count()
+        self.assertEqual(membership.completed_days, in_window)
+        self.assertEqual(
+            sum(ChallengeDay.objects.filter(challenge=self.challenge).values_list("completed_members", flat=True)),
+            in_window,
+        )
+
+    def test_dashboard_checkins_update_counters(self):
+        challenges.join(self.challenge, self.user, self.habit)
+        visible = [self.habit.id, self.other.id]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("dashboard"), {"visible": visible, f"habit_{self.habit.id}": "on"})
+        self.assertEqual(self.day(self.today), 1)
+
+        # Saving the same state again changes nothing
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("dashboard"), {"visible": visible, f"habit_{self.habit.id}": "on"})
+        self.assertEqual(self.day(self.today), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("dashboard"), {"visible": visible})
+        self.assertEqual(self.day(self.today), 0)
+        self.assertEqual(ChallengeMembership.objects.get(user=self.user).completed_days, 0)
+
+    def test_leave_removes_contribution(self):
+        make_history([self.habit], 5)
+        membership = challenges.join(self.challenge, self.user, self.habit)
+        challenges.leave(membership)
+        self.assertFalse(
+            ChallengeDay.objects.filter(challenge=self.challenge, completed_members__gt=0).exists()
+        )
+
+    def test_deleting_linked_habit_leaves_the_challenge(self):
+        make_history([self.habit], 9)
+        challenges.join(self.challenge, self.user, self.habit)
+
+        soft_delete_habit(self.habit)
+
+        self.assertFalse(ChallengeMembership.objects.filter(user=self.user).exists())
+        self.assertFalse(
+            ChallengeDay.objects.filter(challenge=self.challenge, completed_members__gt=0).exists()
+        )
+
+    def test_rebuild_matches_incremental_counters(self):
+        make_history([self.habit], 12)
+        challenges.join(self.challenge, self.user, self.habit)
+        before = list(ChallengeDay.objects.filter(challenge=self.challenge).values_list("completed_members", flat=True))
+
+        ChallengeDay.objects.filter(challenge=self.challenge).update(completed_members=0)
+        challenges.rebuild(self.challenge)
+
+        after = list(ChallengeDay.objects.filter(challenge=self.challenge).values_list("completed_members", flat=True))
+        self.assertEqual(before, after)
+
+    def test_rebuild_and_leave_read_archived_logs(self):
+        old = challenges.create_challenge(self.owner, "Last year", self.today - timedelta(days=600), days=30)
+        make_history([self.habit], 620)
+        membership = challenges.join(old, self.user, self.habit)
+        counters = lambda: list(old.days.values_list("completed_members", flat=True))
+        before = counters()
+
+        archive_logs(self.today - timedelta(days=500))
+        challenges.rebuild(old)
+        self.assertEqual(counters(), before)
+        self.assertEqual(ChallengeMembership.objects.get(id=membership.id).completed_days, sum(before))
+
+        challenges.leave(membership)
+        self.assertEqual(set(counters()), {0})
+
+
+class ChallengeBoardQueryTests(HabitTestCase):
+    def test_board_queries_do_not_grow_with_members(self):
+        today = timezone.localdate()
+        owner = make_user("owner")
+        self.client.force_login(owner)
+
+        for n_members in (5, 200):
+            challenge = challenges.create_challenge(owner, f"{n_members} members", today, days=30)
+            for i in range(n_members):
+                user = make_user(f"m{n_members}_{i}")
+                habit, = make_habits(user, 1)
+                challenges.join(challenge, user, habit)
+
+            url = reverse("challenge_board", args=[challenge.id])
+            self.client.get(url)
+            # challenge, members + users, days, owner's habits to join with
+            with self.assertNumQueries(4):
+                response = self.client.get(url)
+            self.assertEqual(len(response.context["members"]), n_members)
+
+    def test_create_join_and_list(self):
+        user = make_user("creator")
+        habit, = make_habits(user, 1)
+        self.client.force_login(user)
+
+        response = self.client.post(reverse("create_challenge"), {
+            "name": "Read daily", "description": "", "start_date": timezone.localdate().isoformat(), "days": 7,
+        })
+        challenge = Challenge.objects.get(name="Read daily")
+        self.assertRedirects(response, reverse("challenge_board", args=[challenge.id]))
+        self.assertEqual(challenge.days.count(), 7)
+
+        response = self.client.post(reverse("join_challenge", args=[challenge.id]), {"habit": "²"})
+        self.assertRedirects(response, reverse("challenge_board", args=[challenge.id]))
+        self.assertFalse(ChallengeMembership.objects.filter(challenge=challenge, user=user).exists())
+
+        self.client.post(reverse("join_challenge", args=[challenge.id]), {"habit": habit.id})
+        self.assertTrue(ChallengeMembership.objects.filter(challenge=challenge, user=user).exists())
+
+        response = self.client.get(reverse("challenge_list"))
+        self.assertContains(response, "Read daily")
+        self.assertContains(response, "Joined")
@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from habits.archive import completions_by_habit_name
+from habits.challenges import create_challenge, join
+from habits.deletion import purge_habits, purge_users, soft_delete_user
+from habits.models import ChallengeMembership, Habit, HabitLog, UserProfile
+
+from .base import HabitTestCase
+from .factories import make_habits, make_history, make_user, make_user_with_history
+
+
+class SoftDeleteHabitTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user, self.habits = make_user_with_history("small")
+        self.client.force_login(self.user)
+
+    def test_delete_takes_the_same_queries_for_any_history(self):
+        fresh, old = make_habits(self.user, 2)
+        make_history([old], 400)
+
+        for habit in (fresh, old):
+            url = reverse("delete_habit", args=[habit.id])
+            self.client.get(url)
+            # fetch the habit, its challenge memberships, then one UPDATE;
+            # no logs are touched
+            with self.assertNumQueries(3):
+                response = self.client.post(url)
+            self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+    def test_deleted_habit_and_logs_are_hidden(self):
+        habit = self.habits[0]
+        self.client.post(reverse("delete_habit", args=[habit.id]))
+
+        self.assertFalse(Habit.objects.filter(id=habit.id).exists())
+        self.assertFalse(HabitLog.objects.filter(habit_id=habit.id).exists())
+        self.assertTrue(HabitLog.all_objects.filter(habit_id=habit.id).exists())
+        self.assertNotIn(habit.name, completions_by_habit_name(self.user))
+        self.assertEqual(self.client.get(reverse("edit_habit", args=[habit.id])).status_code, 404)
+
+    def test_purge_removes_habit_and_logs(self):
+        habit = self.habits[0]
+        self.client.post(reverse("delete_habit", args=[habit.id]))
+
+        counts = purge_habits(timezone.now(), batch_size=2)
+
+        self.assertEqual(counts["Habit"], 1)
+        self.assertEqual(counts["HabitLog"], 7)
+        self.assertFalse(Habit.all_objects.filter(id=habit.id).exists())
+        self.assertFalse(HabitLog.all_objects.filter(habit_id=habit.id).exists())
+        self.assertEqual(HabitLog.objects.filter(habit__user=self.user).count(), 14)
+
+
+class SoftDeleteAccountTests(HabitTestCase):
+    def test_admin_delete_deactivates_then_purge_removes(self):
+        admin = make_user("admin", is_staff=True, is_superuser=True)
+        user, _ = make_user_with_history("small")
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            reverse("admin:auth_user_delete", args=[user.pk]), {"post": "yes"},
+        )
+        self.assertEqual(response.status_code, 302)
+
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertFalse(Habit.objects.filter(user=user).exists())
+        self.assertIsNotNone(UserProfile.objects.get(user=user).deleted_at)
+
+        purge_habits(timezone.now())
+        self.assertEqual(purge_users(timezone.now()), 1)
+        self.assertFalse(User.objects.filter(pk=user.pk).exists())
+        self.assertFalse(HabitLog.all_objects.filter(habit__user_id=user.pk).exists())
+
+    def test_purging_an_owner_keeps_their_challenges(self):
+        owner = make_user("owner")
+        challenge = create_challenge(owner, "Run", timezone.localdate(), days=10)
+        member = make_user("member")
+        join(challenge, member, make_habits(member, 1)[0])
+
+        soft_delete_user(owner)
+        purge_habits(timezone.now())
+        purge_users(timezone.now())
+
+        challenge.refresh_from_db()
+        self.assertIsNone(challenge.owner_id)
+        self.assertTrue(ChallengeMembership.objects.filter(challenge=challenge, user=member).exists())
@@ -0,0 +1,43 @@
+from unittest import mock
+
+from django.urls import reverse
+
+from .base import HabitTestCase
+from .factories import make_habits, make_user
+
+
+class LiveUpdateEventTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.habit = make_habits(self.user, 1)[0]
+        self.client.force_login(self.user)
+
+    def events(self, method, *args, **kwargs):
+        with mock.patch("habits.signals.get_broker") as broker, \
+                self.captureOnCommitCallbacks(execute=True):
+            method(*args, **kwargs)
+        return [c.args[1:] for c in broker.return_value.publish.call_args_list]
+
+    def check_in(self, done):
+        data = {"visible": [self.habit.id]}
+        if done:
+            data[f"habit_{self.habit.id}"] = "on"
+        return self.events(self.client.post, reverse("dashboard"), data)
+
+    def test_log_events_carry_the_completed_delta(self):
+        deltas = lambda events: [data["delta"] for event, data in events if event == "log"]
+
+        self.assertEqual(deltas(self.check_in(True)), [1])
+        self.assertEqual(deltas(self.check_in(True)), [])  # unchanged: not saved
+        self.assertEqual(deltas(self.check_in(False)), [-1])
+
+    def test_odd_visible_ids_are_ignored(self):
+        data = {"visible": ["²", "x", self.habit.id], f"habit_{self.habit.id}": "on"}
+        events = self.events(self.client.post, reverse("dashboard"), data)
+        self.assertEqual([d["delta"] for e, d in events if e == "log"], [1])
+
+    def test_archive_and_restore_publish_habit_events(self):
+        url = reverse("archive_habit", args=[self.habit.id])
+        self.assertIn(("habit", {"habit": self.habit.id, "active": False}), self.events(self.client.post, url))
+        self.assertIn(("habit", {"habit": self.habit.id, "active": True}), self.events(self.client.post, url))
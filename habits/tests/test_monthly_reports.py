@@ -0,0 +1,39 @@
+import calendar
+from datetime import timedelta
+
+from django.utils import timezone
+
+from habits.archive import archive_logs, completion_counts
+from habits.management.commands.render_monthly_reports import Command
+from habits.models import Habit
+
+from .base import HabitTestCase
+from .factories import make_habits, make_history, make_user
+
+
+class MonthlyReportTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.user = make_user(email="user@example.com")
+        habits = make_habits(self.user, 3)
+        make_history(habits, 700)
+        Habit.objects.filter(id=habits[0].id).update(archived=True)
+        archive_logs(self.today - timedelta(days=500))
+
+    def report(self, first):
+        last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+        user = {"pk": self.user.pk, "username": self.user.username, "email": self.user.email}
+        report = Command().collect([user], first, last)[self.user.pk]
+        counts = completion_counts(self.user, first, last)
+        return report, [counts[first + timedelta(days=d)] for d in range((last - first).days + 1)]
+
+    def test_daily_counts_match_the_in_app_chart(self):
+        for days_ago in (40, 600):
+            first = (self.today - timedelta(days=days_ago)).replace(day=1)
+            with self.subTest(month=f"{first:%Y-%m}"):
+                report, expected = self.report(first)
+                self.assertEqual(report["daily"], expected)
+                self.assertEqual(report["summary"]["completions"], sum(expected))
+                self.assertGreater(sum(expected), 0)
+                self.assertEqual(report["summary"]["total_habits"], 2)
@@ -0,0 +1,30 @@
+from django.urls import reverse
+
+from habits.models import Habit
+
+from .base import HabitTestCase
+from .factories import make_habits, make_user
+
+
+class MoveHabitTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.habits = make_habits(self.user, 3)
+        self.client.force_login(self.user)
+
+    def order(self):
+        return list(Habit.objects.filter(user=self.user).order_by("position", "id").values_list("id", flat=True))
+
+    def test_move_up_and_down(self):
+        first, second, third = (h.id for h in self.habits)
+        self.client.post(reverse("move_habit", args=[first, "down"]))
+        self.assertEqual(self.order(), [second, first, third])
+        self.client.post(reverse("move_habit", args=[third, "up"]))
+        self.assertEqual(self.order(), [second, third, first])
+
+    def test_unknown_direction_is_not_found(self):
+        before = self.order()
+        response = self.client.post(f"/move-habit/{self.habits[0].id}/sideways/")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.order(), before)
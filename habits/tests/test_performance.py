@@ -0,0 +1,65 @@
+import time
+
+from django.urls import reverse
+from django.utils import timezone
+
+from habits.models import HabitLog, UserProfile
+from habits.utils import update_streak_and_xp
+
+from .base import HabitTestCase
+from .factories import make_user_with_history
+
+
+# Generous ceilings (ms) for the largest history size; they catch
+# accidental per-row Python loops or N+1 queries, not small drift.
+TIME_BUDGETS_MS = {
+    "update_streak_and_xp": 25,
+    "heatmap": 200,
+    "profile": 150,
+}
+
+
+def best_time_ms(func, runs=5):
+    func()  # warm caches
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+class TimeBudgetTests(HabitTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.habits = make_user_with_history("large")
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=habit, date=timezone.localdate(), completed=True)
+            for habit in cls.habits
+        ])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def assertWithinBudget(self, name, func):
+        elapsed = best_time_ms(func)
+        self.assertLessEqual(
+            elapsed, TIME_BUDGETS_MS[name],
+            f"{name} took {elapsed:.1f} ms (budget {TIME_BUDGETS_MS[name]} ms)",
+        )
+
+    def test_update_streak_and_xp(self):
+        def award_today():
+            # Force the full streak/XP path on every run; the profile is
+            # re-read inside update_streak_and_xp, so reset the row itself
+            UserProfile.objects.filter(user=self.user).update(last_active_date=None)
+            update_streak_and_xp(self.user)
+
+        self.assertWithinBudget("update_streak_and_xp", award_today)
+
+    def test_heatmap(self):
+        self.assertWithinBudget("heatmap", lambda: self.client.get(reverse("heatmap")))
+
+    def test_profile(self):
+        self.assertWithinBudget("profile", lambda: self.client.get(reverse("profile")))
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.urls import reverse
+
+from habits.models import UserProfile
+
+from .base import HabitTestCase
+from .factories import make_habits, make_user
+
+
+class ProfileWriteTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user()
+        self.habit = make_habits(self.user, 1)[0]
+        self.client.force_login(self.user)
+        self.client.get(reverse("dashboard"))  # caches the user and profile
+
+    def test_check_in_does_not_write_back_the_cached_profile(self):
+        # Changed behind the cache's back (bulk_update, another process)
+        UserProfile.objects.filter(user=self.user).update(xp=500)
+
+        self.client.post(reverse("dashboard"), {"visible": [self.habit.id], f"habit_{self.habit.id}": "on"})
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.xp, 510)
+        self.assertEqual(profile.level, 6)
+
+    def test_avatar_change_keeps_a_claimed_reminder(self):
+        claimed = datetime(2030, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        # run_reminders' claim_due bulk_updates the row; the cache still has the old value
+        UserProfile.objects.filter(user=self.user).update(next_reminder_at=claimed, xp=40)
+
+        self.client.post(reverse("profile"), {"avatar": "avatar2.gif"})
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.avatar, "avatar2.gif")
+        self.assertEqual(profile.next_reminder_at, claimed)
+        self.assertEqual(profile.xp, 40)
+
+    def test_unknown_avatar_is_rejected(self):
+        response = self.client.post(reverse("profile"), {"avatar": "../../settings.py"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UserProfile.objects.get(user=self.user).avatar, "avatar1.gif")
+        self.assertEqual(self.client.get(reverse("profile")).status_code, 200)
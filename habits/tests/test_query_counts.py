@@ -0,0 +1,117 @@
+from django.urls import reverse
+from django.utils import timezone
+
+from habits import challenges
+
+from .base import HabitTestCase
+from .factories import HISTORY_SIZES, make_habits, make_history, make_user, make_user_with_history
+
+
+# Queries per GET once the user is cached (CachedAuthenticationMiddleware).
+# These must stay the same however much history the user has.
+EXPECTED_QUERIES = {
+    "dashboard": 3,
+    "daily_chart_data": 1,
+    "monthly_chart": 1,
+    "weekly_analytics": 1,
+    "heatmap": 2,
+    "profile": 4,
+    "archived_habits": 1,
+    "add_habit": 0,
+    "year_in_review": 3,
+    "year_in_review_data": 3,
+    "challenge_list": 3,
+    "create_challenge": 0,
+}
+
+# Views on one habit or challenge, in the order they are run:
+# (method, view, url args, POST data, queries). "habit", "spare" and
+# "challenge" in the args stand for the test's objects.
+EXPECTED_OBJECT_QUERIES = [
+    ("get", "edit_habit", ["habit"], None, 1),
+    ("get", "delete_habit", ["habit"], None, 1),
+    ("get", "challenge_board", ["challenge"], None, 4),  # not a member: lists habits to join with
+    ("post", "edit_habit", ["habit"], {"name": "Renamed"}, 2),
+    ("post", "archive_habit", ["habit"], {}, 2),
+    ("post", "archive_habit", ["habit"], {}, 2),
+    ("post", "move_habit", ["habit", "down"], {}, 5),
+    ("post", "join_challenge", ["challenge"], {"habit": "spare"}, 7),
+    ("get", "challenge_board", ["challenge"], None, 3),
+    ("post", "leave_challenge", ["challenge"], {}, 5),
+    ("post", "add_habit", [], {"name": "New"}, 2),
+    ("post", "delete_habit", ["habit"], {}, 3),
+]
+
+# Dashboard POST: a fixed cost, plus one write per visible habit whose
+# state changed (or that gets its first log of the day). Never a
+# function of history or of unchanged habits.
+DASHBOARD_POST_QUERIES = 8
+
+
+class ViewQueryCountTests(HabitTestCase):
+    def test_query_counts_do_not_grow_with_history(self):
+        for size in HISTORY_SIZES:
+            user, _ = make_user_with_history(size)
+            challenges.create_challenge(user, f"Challenge {size}", timezone.localdate(), 30)
+            self.client.force_login(user)
+
+            for view, expected in EXPECTED_QUERIES.items():
+                with self.subTest(size=size, view=view):
+                    url = reverse(view)
+                    self.client.get(url)  # caches the user and session
+                    with self.assertNumQueries(expected):
+                        response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_object_views_do_not_grow_with_history(self):
+        for size in ("new", "large"):
+            user, habits = make_user_with_history(size)
+            challenge = challenges.create_challenge(make_user(f"owner_{size}"), "Walk", timezone.localdate(), 30)
+            objects = {"habit": habits[0].id, "spare": habits[1].id, "challenge": challenge.id}
+            self.client.force_login(user)
+
+            for method, view, args, data, expected in EXPECTED_OBJECT_QUERIES:
+                with self.subTest(size=size, method=method, view=view):
+                    url = reverse(view, args=[objects.get(a, a) for a in args])
+                    self.client.get(reverse("dashboard"))  # caches the user again after writes
+                    if method == "get":
+                        self.client.get(url)
+                        with self.assertNumQueries(expected):
+                            response = self.client.get(url)
+                        self.assertEqual(response.status_code, 200)
+                    else:
+                        data = {k: objects.get(v, v) for k, v in data.items()}
+                        with self.assertNumQueries(expected):
+                            response = self.client.post(url, data)
+                        self.assertEqual(response.status_code, 302)
+
+    def test_dashboard_post_grows_only_with_changed_visible_habits(self):
+        for days in (0, 400):
+            user = make_user(f"user_{days}")
+            habits = make_habits(user, 10)
+            make_history(habits, days)
+            self.client.force_login(user)
+            url = reverse("dashboard")
+            # Today's XP is awarded once, on the first check-in
+            self.client.post(url, {"visible": [habits[0].id], f"habit_{habits[0].id}": "on"})
+
+            for visible in (habits[:5], habits):
+                ids = [habit.id for habit in visible]
+                checked = {f"habit_{i}": "on" for i in ids}
+                for label, data, changed in (
+                    ("off", {}, len(ids)),
+                    ("on", checked, len(ids)),
+                    ("unchanged", checked, 0),
+                ):
+                    with self.subTest(days=days, visible=len(ids), case=label):
+                        self.client.get(url)
+                        with self.assertNumQueries(DASHBOARD_POST_QUERIES + changed):
+                            self.client.post(url, {"visible": ids, **data})
+
+    def test_first_request_loads_user_and_profile_together(self):
+        user, _ = make_user_with_history("small")
+        self.client.force_login(user)
+
+        # user + profile (the session is already cached), then the view
+        with self.assertNumQueries(2 + EXPECTED_QUERIES["profile"]):
+            self.client.get(reverse("profile"))
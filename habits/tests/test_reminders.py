@@ -0,0 +1,35 @@
+from datetime import time, timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+from habits.models import UserProfile
+
+from .base import HabitTestCase
+from .factories import make_habits, make_user
+
+
+class RunRemindersTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.due_at = timezone.now() - timedelta(minutes=5)
+        for i in range(3):
+            user = make_user(f"user{i}", email=f"user{i}@example.com")
+            make_habits(user, 2)
+        UserProfile.objects.update(reminder_time=time(8, 0), timezone="UTC", next_reminder_at=self.due_at)
+
+    def run_reminders(self, *args):
+        out = StringIO()
+        call_command("run_reminders", "--batch-size", "2", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_claims_nothing(self):
+        self.assertIn("3 reminders due, 3 would be sent", self.run_reminders("--dry-run"))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(UserProfile.objects.filter(next_reminder_at=self.due_at).count(), 3)
+
+        self.assertIn("3 reminders due, 3 sent", self.run_reminders())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(UserProfile.objects.filter(next_reminder_at__lte=timezone.now()).exists())
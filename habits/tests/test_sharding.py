@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from habits import challenges
+from habits.models import ChallengeDay, ChallengeMembership, Habit, HabitLog, UserProfile
+from habits.sharding import shard_for_user, use_user_shard
+
+from .base import HabitTestCase
+from .factories import make_habits, make_history, make_user
+from .runner import TEST_SHARD as SHARD
+
+
+def make_user_on(alias, prefix):
+    """A user whose id maps to `alias` with two shards."""
+    with override_settings(HABITS_SHARD_COUNT=2):
+        for i in range(2):
+            user = make_user(f"{prefix}{i}")
+            if shard_for_user(user.pk) == alias:
+                return user
+    raise AssertionError(f"no user id maps to {alias}")
+
+
+@override_settings(HABITS_SHARD_COUNT=2)
+class TwoShardTests(HabitTestCase):
+    databases = {"default", SHARD}
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user_on(SHARD, "sharded")
+
+    def test_profile_is_created_on_the_users_shard(self):
+        self.assertTrue(UserProfile.objects.using(SHARD).filter(user=self.user).exists())
+        self.assertFalse(UserProfile.objects.using("default").filter(user=self.user).exists())
+
+    def test_dashboard_reads_and_writes_the_users_shard(self):
+        with use_user_shard(self.user.pk):
+            habit = make_habits(self.user, 2)[0]
+            make_history([habit], 5)
+        self.client.force_login(self.user)
+
+        with self.captureOnCommitCallbacks(using=SHARD, execute=True):
+            response = self.client.post(reverse("dashboard"), {"visible": [habit.id], f"habit_{habit.id}": "on"})
+        self.assertEqual(response.status_code, 302)
+
+        today = timezone.localdate()
+        self.assertTrue(HabitLog.objects.using(SHARD).filter(habit_id=habit.id, date=today, completed=True).exists())
+        self.assertFalse(HabitLog.objects.using("default").filter(date=today).exists())
+        self.assertEqual(UserProfile.objects.using(SHARD).get(user=self.user).xp, 10)
+
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual([h.id for h in response.context["completed_habits"]], [habit.id])
+        self.assertEqual(len(response.context["incomplete_habits"]), 1)
+
+
+class RebalanceTests(HabitTestCase):
+    databases = {"default", SHARD}
+
+    def test_rebalance_moves_habits_and_remaps_memberships(self):
+        # Created with one shard: everything starts on default
+        user = make_user_on(SHARD, "mover")
+        UserProfile.objects.using("default").get_or_create(user=user)
+        neighbour = make_user("neighbour")
+        neighbour_habits = make_habits(neighbour, 3)
+        habits = make_habits(user, 3)
+        make_history(habits, 10)
+        challenge = challenges.create_challenge(neighbour, "Read", timezone.localdate(), days=7)
+        challenges.join(challenge, user, habits[2])
+
+        with override_settings(HABITS_SHARD_COUNT=2):
+            call_command("rebalance_shards", stdout=StringIO())
+
+            moved = Habit.all_objects.using(SHARD).filter(user=user)
+            self.assertEqual(moved.count(), 3)
+            self.assertEqual(HabitLog.all_objects.using(SHARD).filter(habit__in=moved).count(), 30)
+            self.assertFalse(Habit.all_objects.using("default").filter(user=user).exists())
+            self.assertTrue(Habit.all_objects.using("default").filter(id=neighbour_habits[0].id).exists())
+
+            membership = ChallengeMembership.objects.get(user=user)
+            linked = Habit.all_objects.using(SHARD).get(id=membership.habit_id)
+            self.assertEqual((linked.user_id, linked.name), (user.pk, habits[2].name))
+
+            # Checking in on the moved habit still moves the counters
+            self.client.force_login(user)
+            with self.captureOnCommitCallbacks(using=SHARD, execute=True):
+                self.client.post(reverse("dashboard"), {"visible": [linked.id], f"habit_{linked.id}": "on"})
+            day = ChallengeDay.objects.get(challenge=challenge, date=timezone.localdate())
+            self.assertEqual(day.completed_members, 1)
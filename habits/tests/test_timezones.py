@@ -0,0 +1,69 @@
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.urls import reverse
+
+from habits.models import HabitLog, UserProfile
+
+from .base import HabitTestCase
+from .factories import make_habits, make_history, make_user
+from .test_query_counts import EXPECTED_QUERIES
+
+
+# 12:00 UTC is already the 11th in Kiritimati (UTC+14) but still the
+# 10th in Pago Pago (UTC-11) and in the site zone (Asia/Kolkata).
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def user_in(zone, username):
+    user = make_user(username)
+    UserProfile.objects.filter(user=user).update(timezone=zone)
+    return user
+
+
+@mock.patch("django.utils.timezone.now", return_value=NOW)
+class UserTimezoneTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.east = user_in("Pacific/Kiritimati", "east")
+        self.west = user_in("Pacific/Pago_Pago", "west")
+
+    def check_in(self, user):
+        habit = make_habits(user, 1)[0]
+        self.client.force_login(user)
+        self.client.post(reverse("dashboard"), {"visible": [habit.id], f"habit_{habit.id}": "on"})
+        return HabitLog.objects.get(habit=habit)
+
+    def test_check_in_uses_the_users_local_day(self, _now):
+        self.assertEqual(self.check_in(self.east).date, date(2026, 3, 11))
+        self.assertEqual(self.check_in(self.west).date, date(2026, 3, 10))
+
+    def test_streak_and_today_chart_follow_the_local_day(self, _now):
+        self.check_in(self.east)
+        self.assertEqual(UserProfile.objects.get(user=self.east).last_active_date, date(2026, 3, 11))
+
+        data = self.client.get(reverse("daily_chart_data")).json()
+        self.assertEqual(data["data"], [1, 0])
+
+    def test_weekly_buckets_end_on_the_local_day(self, _now):
+        habits = make_habits(self.east, 2)
+        make_history(habits, 6, today=date(2026, 3, 11))
+        self.client.force_login(self.east)
+
+        data = self.client.get(reverse("weekly_analytics")).context["data"]
+        self.assertEqual(data[-1]["day"], "Wed")  # 11 March
+        self.assertEqual(
+            sum(d["count"] for d in data),
+            HabitLog.objects.filter(habit__in=habits, completed=True).count(),
+        )
+
+    def test_user_timezone_costs_no_queries(self, _now):
+        make_history(make_habits(self.west, 3), 30)
+        self.client.force_login(self.west)
+
+        for view in ("dashboard", "daily_chart_data", "weekly_analytics", "heatmap"):
+            with self.subTest(view=view):
+                url = reverse(view)
+                self.client.get(url)
+                with self.assertNumQueries(EXPECTED_QUERIES[view]):
+                    self.client.get(url)
@@ -0,0 +1,106 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.urls import reverse
+from django.utils import timezone
+
+from habits import trends
+from habits.archive import archive_logs
+from habits.models import HabitLog
+
+from .base import HabitTestCase
+from .factories import make_habits, make_history, make_user
+
+
+def naive_longest_run(row):
+    best = run = 0
+    for value in row:
+        run = run + 1 if value else 0
+        best = max(best, run)
+    return best
+
+
+class VectorizedStatsTests(HabitTestCase):
+    def test_longest_runs_matches_loop(self):
+        matrix = np.random.default_rng(7).random((20, 400)) < 0.7
+        matrix[3] = False
+        matrix[4] = True
+        self.assertEqual(
+            trends.longest_runs(matrix).tolist(),
+            [naive_longest_run(row) for row in matrix],
+        )
+
+    def test_rolling_rate_matches_loop(self):
+        rng = np.random.default_rng(3)
+        possible = rng.integers(0, 5, 60)
+        completed = np.minimum(rng.integers(0, 5, 60), possible)
+        for window in (7, 30):
+            expected = []
+            for i in range(60):
+                c = completed[max(0, i - window + 1):i + 1].sum()
+                p = possible[max(0, i - window + 1):i + 1].sum()
+                expected.append(c / p if p else 0.0)
+            np.testing.assert_allclose(trends.rolling_rate(completed, possible, window), expected)
+
+    def test_analyze_five_years_of_100_habits(self):
+        days = np.arange(np.datetime64("2021-01-01"), np.datetime64("2026-01-01"))
+        done = np.random.default_rng(1).random((100, len(days))) < 0.6
+        series = trends.Series(list(range(100)), [f"H{i}" for i in range(100)], days, done, np.ones_like(done))
+
+        trends.analyze(series)
+        start = time.perf_counter()
+        report = trends.analyze(series)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.assertEqual(report["totals"]["completed"], int(done.sum()))
+        self.assertEqual(len(report["months"]), 60)
+        self.assertLess(elapsed_ms, 100)
+
+
+class YearInReviewTests(HabitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.user = make_user()
+        self.habits = make_habits(self.user, 3)
+        make_history(self.habits, 900)
+        self.client.force_login(self.user)
+
+    def test_archived_days_are_included(self):
+        before = trends.load_series(self.user, self.today)
+        archive_logs(self.today - timedelta(days=500))
+        after = trends.load_series(self.user, self.today)
+
+        self.assertEqual(after.done.sum(), before.done.sum())
+        np.testing.assert_array_equal(after.done, before.done)
+
+    def test_year_totals_match_logs(self):
+        year = self.today.year - 1
+        report = trends.year_in_review(self.user, year, self.today)
+        self.assertEqual(
+            report["totals"]["completed"],
+            HabitLog.objects.filter(habit__user=self.user, completed=True, date__year=year).count(),
+        )
+        self.assertEqual(len(report["days"]), (date(year, 12, 31) - date(year, 1, 1)).days + 1)
+        self.assertIn(year, report["years"])
+
+    def test_data_endpoint_queries_do_not_grow_with_history(self):
+        url = reverse("year_in_review_data")
+        self.client.get(url)
+        # session + user are cached; habits, logs, archives
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"year": self.today.year})
+        self.assertEqual(response.json()["year"], self.today.year)
+
+        archive_logs(self.today - timedelta(days=500))
+        with self.assertNumQueries(3):
+            self.client.get(url, {"year": self.today.year})
+
+    def test_bad_year_falls_back_to_this_year(self):
+        for year in ("bogus", "²", "1" * 5000, "1900"):
+            with self.subTest(year=year[:10]):
+                response = self.client.get(reverse("year_in_review"), {"year": year})
+                self.assertContains(response, f"{self.today.year} in Review")
+                data = self.client.get(reverse("year_in_review_data"), {"year": year}).json()
+                self.assertEqual(data["year"], self.today.year)
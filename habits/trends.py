@@ -0,0 +1,178 @@
+"""
+Long-range trend analytics ("year in review").
+
+A user's whole history (live logs and the yearly archive) is loaded once
+into a habits x days boolean matrix. Every statistic is then a handful
+of NumPy passes over that matrix, never a Python loop per day.
+"""
+import zlib
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Habit, HabitLog, HabitLogArchive
+
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+@dataclass
+class Series:
+    habit_ids: list
+    habit_names: list
+    days: np.ndarray       # datetime64[D], one per column
+    done: np.ndarray       # bool [habit, day]: completed
+    alive: np.ndarray      # bool [habit, day]: habit existed (created or first logged)
+
+    def between(self, start, end):
+        keep = (self.days >= np.datetime64(start)) & (self.days <= np.datetime64(end))
+        return Series(self.habit_ids, self.habit_names, self.days[keep],
+                      self.done[:, keep], self.alive[:, keep])
+
+
+# -------------------------
+# Loading
+# -------------------------
+def _archive_days(archive):
+    # Bit n of the bitmap is day n of the year (see archive.encode_days)
+    bits = np.unpackbits(np.frombuffer(zlib.decompress(bytes(archive.bitmap)), np.uint8), bitorder="little")
+    return np.datetime64(f"{archive.year}-01-01") + np.flatnonzero(bits)
+
+
+def load_series(user, today):
+    habits = list(Habit.objects.filter(user=user).order_by("position", "id").values_list("id", "name", "created_at"))
+    index = {habit_id: i for i, (habit_id, _, _) in enumerate(habits)}
+
+    # Dates come back as ISO text and are parsed by NumPy in one go
+    rows = list(
+        HabitLog.objects.filter(habit__user=user, completed=True, date__lte=today)
+        .values_list("habit_id", Cast("date", CharField()))
+    )
+    habit_col = np.fromiter((index[h] for h, _ in rows), np.intp, len(rows))
+    date_col = np.array([d for _, d in rows], dtype="datetime64[D]")
+
+    for archive in HabitLogArchive.objects.filter(habit__user=user):
+        archived = _archive_days(archive)
+        date_col = np.concatenate([date_col, archived])
+        habit_col = np.concatenate([habit_col, np.full(len(archived), index[archive.habit_id], np.intp)])
+
+    today = np.datetime64(today)
+    created = np.array([timezone.localtime(c).date() for _, _, c in habits], dtype="datetime64[D]").reshape(-1)
+    first = min(date_col.min(), created.min()) if len(date_col) else (created.min() if len(habits) else today)
+    first = min(first, today)
+    days = np.arange(first, today + 1)
+
+    done = np.zeros((len(habits), len(days)), dtype=bool)
+    done[habit_col, (date_col - first).astype(np.intp)] = True
+
+    # A habit counts from its creation, or its first log if that is earlier
+    start = (created - first).astype(np.intp) if len(habits) else np.zeros(0, np.intp)
+    logged = done.any(axis=1)
+    start = np.where(logged, np.minimum(start, done.argmax(axis=1)), start)
+    alive = np.arange(len(days)) >= start[:, None]
+
+    return Series([h[0] for h in habits], [h[1] for h in habits], days, done, alive)
+
+
+# -------------------------
+# Vectorized statistics
+# -------------------------
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(np.shape(numerator), float), where=denominator > 0)
+
+
+def rolling_rate(completed, possible, window):
+    """Completion rate over the trailing `window` days, for every day."""
+    c = np.concatenate([[0], np.cumsum(completed)])
+    p = np.concatenate([[0], np.cumsum(possible)])
+    lo = np.maximum(np.arange(1, len(completed) + 1) - window, 0)
+    hi = np.arange(1, len(completed) + 1)
+    return _ratio(c[hi] - c[lo], p[hi] - p[lo])
+
+
+def longest_runs(matrix):
+    """Longest run of True in each row of a 2-D bool array."""
+    rows = matrix.shape[0]
+    if not matrix.size:
+        return np.zeros(rows, dtype=int)
+    padded = np.zeros((rows, matrix.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = matrix
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    best = np.zeros(rows, dtype=int)
+    np.maximum.at(best, start_rows, end_cols - start_cols)
+    return best
+
+
+def analyze(series):
+    completed = series.done.sum(axis=0)
+    possible = series.alive.sum(axis=0)
+
+    weekday = (series.days.astype("datetime64[D]").view("int64") - 4) % 7  # 1970-01-01 was a Thursday
+    weekday_done = np.bincount(weekday, weights=completed, minlength=7)
+    weekday_possible = np.bincount(weekday, weights=possible, minlength=7)
+
+    months, month_index = np.unique(series.days.astype("datetime64[M]"), return_inverse=True)
+    month_rate = _ratio(
+        np.bincount(month_index, weights=completed, minlength=len(months)),
+        np.bincount(month_index, weights=possible, minlength=len(months)),
+    )
+    month_delta = np.diff(month_rate, prepend=np.nan)
+
+    habit_done = series.done.sum(axis=1)
+    habit_rate = _ratio(habit_done, series.alive.sum(axis=1))
+    habit_streaks = longest_runs(series.done)
+    any_day_streak = longest_runs((completed > 0)[None, :])[0] if len(completed) else 0
+
+    return {
+        "days": [str(d) for d in series.days],
+        "daily_completed": completed.tolist(),
+        "rolling_7": np.round(rolling_rate(completed, possible, 7) * 100, 1).tolist(),
+        "rolling_30": np.round(rolling_rate(completed, possible, 30) * 100, 1).tolist(),
+        "weekdays": [
+            {"day": name, "completed": int(n), "rate": round(float(r) * 100, 1)}
+            for name, n, r in zip(WEEKDAYS, weekday_done, _ratio(weekday_done, weekday_possible))
+        ],
+        "months": [
+            {
+                "month": str(m),
+                "rate": round(float(r) * 100, 1),
+                "delta": None if np.isnan(d) else round(float(d) * 100, 1),
+            }
+            for m, r, d in zip(months, month_rate, month_delta)
+        ],
+        "habits": sorted(
+            (
+                {
+                    "id": habit_id, "name": name, "completed": int(n),
+                    "consistency": round(float(r) * 100, 1), "longest_streak": int(s),
+                }
+                for habit_id, name, n, r, s in zip(
+                    series.habit_ids, series.habit_names, habit_done, habit_rate, habit_streaks
+                )
+            ),
+            key=lambda h: -h["consistency"],
+        ),
+        "totals": {
+            "completed": int(completed.sum()),
+            "rate": round(float(_ratio(completed.sum(), possible.sum())) * 100, 1),
+            "active_days": int((completed > 0).sum()),
+            "longest_streak": int(any_day_streak),
+            "best_habit_streak": int(habit_streaks.max()) if len(habit_streaks) else 0,
+        },
+    }
+
+
+def year_in_review(user, year, today):
+    """Stats for one calendar year (up to today) plus the years with any data."""
+    series = load_series(user, today)
+    years = sorted({int(y) for y in series.days.astype("datetime64[Y]").astype(int) + 1970}, reverse=True)
+    report = analyze(series.between(date(year, 1, 1), min(today, date(year, 12, 31))))
+    report["year"] = year
+    report["years"] = years
+    return report
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 from .auth_views import user_login, user_signup, user_logout
 
@@ -9,10 +9,21 @@ urlpatterns = [
     path('daily-data/', views.daily_chart_data, name='daily_data'),
     path('edit-habit/<int:habit_id>/', views.edit_habit, name='edit_habit'),
     path('delete-habit/<int:habit_id>/', views.delete_habit, name='delete_habit'),
+    path('archive-habit/<int:habit_id>/', views.archive_habit, name='archive_habit'),
+    path('archived/', views.archived_habits, name='archived_habits'),
+    re_path(r'^move-habit/(?P<habit_id>[0-9]+)/(?P<direction>up|down)/$', views.move_habit, name='move_habit'),
     path('weekly/', views.weekly_analytics, name='weekly_analytics'),
     path('heatmap/', views.heatmap, name='heatmap'),
+    path("year-in-review/", views.year_in_review_page, name="year_in_review"),
+    path("year-in-review/data/", views.year_in_review_data, name="year_in_review_data"),
     path("daily-chart-data/", views.daily_chart_data, name="daily_chart_data"),
     path("profile/", views.profile, name="profile"),
+    path("challenges/", views.challenge_list, name="challenge_list"),
+    path("challenges/new/", views.create_challenge, name="create_challenge"),
+    path("challenges/<int:challenge_id>/", views.challenge_board, name="challenge_board"),
+    path("challenges/<int:challenge_id>/join/", views.join_challenge, name="join_challenge"),
+    path("challenges/<int:challenge_id>/leave/", views.leave_challenge, name="leave_challenge"),
+    path("progress-stream/", views.progress_stream, name="progress_stream"),
     path("login/", user_login, name="login"),
     path("signup/", user_signup, name="signup"),
     path("logout/", user_logout, name="logout"),
@@ -1,57 +1,97 @@
+from django.db import transaction
 from django.utils import timezone
 from .models import Habit, HabitLog, UserProfile
+from .sharding import shard_for_user, use_user_shard
 
 from datetime import timedelta
+from functools import lru_cache
+from io import BytesIO
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from matplotlib.figure import Figure
 
 
 BASE_XP = 10
 
-def update_streak_and_xp(user):
-    profile, _ = UserProfile.objects.get_or_create(user=user)
-    today = timezone.localdate()
-
-    # Count completed habits today
-    completed_today = HabitLog.objects.filter(
-        habit__user=user,
-        date=today,
-        completed=True
-    ).count()
-
-    # If nothing completed → do nothing
-    if completed_today == 0:
-        return profile
 
-    # 🚫 Prevent double XP on same day
-    if profile.last_active_date == today:
+def get_profile(user):
+    # request.user normally arrives with its profile attached
+    # (CachedAuthenticationMiddleware), so this costs no query.
+    try:
+        return user.userprofile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
         return profile
 
-    # ---------- STREAK LOGIC ----------
-    if profile.last_active_date == today - timedelta(days=1):
-        profile.current_streak += 1
-    else:
-        profile.current_streak = 1
 
-    profile.last_active_date = today
-    profile.best_streak = max(profile.best_streak, profile.current_streak)
+@lru_cache(maxsize=None)
+def get_zone(name):
+    # None falls back to the active (site) timezone
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def user_today(user):
+    """Today's date in the user's own timezone (UserProfile.timezone)."""
+    return timezone.localdate(timezone=get_zone(get_profile(user).timezone))
+
+
+def update_streak_and_xp(user):
+    today = user_today(user)
+
+    # The write transaction (IMMEDIATE) holds the lock from the first
+    # read, and the profile is re-read inside it: the cached
+    # request.user.userprofile is a snapshot and is never written back.
+    with use_user_shard(user.pk), transaction.atomic(using=shard_for_user(user.pk)):
+        profile, _ = UserProfile.objects.select_for_update().get_or_create(user=user)
+
+        # Count completed habits today
+        completed_today = HabitLog.objects.filter(
+            habit__user=user,
+            date=today,
+            completed=True
+        ).count()
+
+        # If nothing completed → do nothing
+        if completed_today == 0:
+            return profile
+
+        # 🚫 Prevent double XP on same day
+        if profile.last_active_date == today:
+            return profile
+
+        # ---------- STREAK LOGIC ----------
+        if profile.last_active_date == today - timedelta(days=1):
+            profile.current_streak += 1
+        else:
+            profile.current_streak = 1
+
+        profile.last_active_date = today
+        profile.best_streak = max(profile.best_streak, profile.current_streak)
 
-    # ---------- XP LOGIC ----------
-    gained_xp = completed_today * BASE_XP
-    profile.xp += gained_xp
+        # ---------- XP LOGIC ----------
+        gained_xp = completed_today * BASE_XP
+        profile.xp += gained_xp
 
-    # ---------- LEVEL ----------
-    profile.level = (profile.xp // 100) + 1
+        # ---------- LEVEL ----------
+        profile.level = (profile.xp // 100) + 1
 
-    profile.save()
+        profile.save(update_fields=["current_streak", "last_active_date", "best_streak", "xp", "level"])
     return profile
 
 
+def render_monthly_chart(daily_count, title="Monthly Habit Progress"):
+    # Figure API (no pyplot global state) so it is safe in threads and
+    # in the report command's worker processes.
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(range(1, len(daily_count) + 1), daily_count, marker='o')
+    ax.set_xlabel("Day")
+    ax.set_ylabel("Completed Habits")
+    ax.set_title(title)
 
-def get_badges(streak):
-    badges = []
-    if streak >= 7:
-        badges.append("🥉 Bronze Streak (7 days)")
-    if streak >= 30:
-        badges.append("🥈 Silver Streak (30 days)")
-    if streak >= 100:
-        badges.append("🥇 Gold Streak (100 days)")
-    return badges
\ No newline at end of file
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
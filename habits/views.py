@@ -1,23 +1,30 @@
-import matplotlib.pyplot as plt
-from io import BytesIO
+import asyncio
+import json
+import re
 from django.utils import timezone
 import calendar
 from collections import defaultdict
 
-from django.http import HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
-
-from .models import Habit, HabitLog
-from .forms import HabitForm
-from .utils import  get_badges
-from .utils import update_streak_and_xp
-from habits.models import UserProfile
+from django.db import router, transaction
+from django.db.models import Count, FilteredRelation, Max, Q
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from .models import Challenge, ChallengeMembership, Habit, HabitLog
+from .forms import ChallengeForm, HabitForm, ReminderForm
+from .achievements import badges_for
+from .utils import get_profile, render_monthly_chart, update_streak_and_xp, user_today
+from .pubsub import get_broker
+from .archive import completion_counts, completions_by_habit_name
+from .reminders import next_reminder_at
+from .deletion import soft_delete_habit
+from .signals import publish
+from .trends import year_in_review
+from . import challenges
 from datetime import timedelta
-import matplotlib
-
-matplotlib.use("Agg")
 
 
 
@@ -29,31 +36,17 @@ def monthly_chart(request):
     today = timezone.localdate()
     year, month = today.year, today.month
 
-    logs = HabitLog.objects.filter(
-        habit__user=request.user,
-        date__year=year,
-        date__month=month,
-        completed=True
+    days_in_month = calendar.monthrange(year, month)[1]
+    counts = completion_counts(
+        request.user, today.replace(day=1), today.replace(day=days_in_month)
     )
 
-    days_in_month = calendar.monthrange(year, month)[1]
     daily_count = [0] * days_in_month
 
-    for log in logs:
-        daily_count[log.date.day - 1] += 1
+    for day, count in counts.items():
+        daily_count[day.day - 1] = count
 
-    plt.figure(figsize=(10, 4))
-    plt.plot(range(1, days_in_month + 1), daily_count, marker='o')
-    plt.xlabel("Day")
-    plt.ylabel("Completed Habits")
-    plt.title("Monthly Habit Progress")
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    plt.close()
-
-    return HttpResponse(buffer.getvalue(), content_type='image/png')
+    return HttpResponse(render_monthly_chart(daily_count), content_type='image/png')
 
 
 # -------------------------
@@ -61,16 +54,19 @@ def monthly_chart(request):
 # -------------------------
 @login_required
 def daily_chart_data(request):
-    today = timezone.localdate()
-
-    completed = HabitLog.objects.filter(
-        habit__user=request.user,
-        date=today,
-        completed=True
-    ).count()
-
-    total = Habit.objects.filter(user=request.user).count()
-    remaining = max(total - completed, 0)
+    today = user_today(request.user)
+
+    # One query: active habits, each joined to at most its log for today
+    counts = (
+        Habit.objects.filter(user=request.user).active()
+        .alias(today_log=FilteredRelation("logs", condition=Q(logs__date=today)))
+        .aggregate(
+            total=Count("id"),
+            completed=Count("today_log", filter=Q(today_log__completed=True)),
+        )
+    )
+    completed = counts["completed"]
+    remaining = max(counts["total"] - completed, 0)
 
     return JsonResponse({
         "labels": ["Completed", "Remaining"],
@@ -78,33 +74,114 @@ def daily_chart_data(request):
     })
 
 
+# -------------------------
+# 📡 Live progress (Server-Sent Events)
+# -------------------------
+SSE_HEARTBEAT_SECONDS = 15
+
+
+async def progress_events(user_id):
+    broker = get_broker()
+    queue = broker.subscribe(user_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        broker.unsubscribe(user_id, queue)
+
+
+@login_required
+async def progress_stream(request):
+    # Only the ASGI app can hold a stream open without tying up a worker;
+    # 204 tells EventSource to stop reconnecting.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await request.auser()
+    response = StreamingHttpResponse(
+        progress_events(user.id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 # -------------------------
 # 🏠 Dashboard (MAIN)
 # -------------------------
+HABITS_PER_PAGE = 50
+
+
+def parse_cursor(value):
+    try:
+        position, habit_id = map(int, value.split("-"))
+        return position, habit_id
+    except (AttributeError, ValueError):
+        return None
+
+
+def habit_page(user, cursor):
+    # Keyset pagination over the habit_active_order_idx partial index
+    habits = Habit.objects.filter(user=user).active().order_by("position", "id")
+    if cursor:
+        position, habit_id = cursor
+        habits = habits.filter(
+            Q(position__gt=position) | Q(position=position, id__gt=habit_id)
+        )
+
+    page = list(habits[:HABITS_PER_PAGE + 1])
+    next_cursor = None
+    if len(page) > HABITS_PER_PAGE:
+        page = page[:HABITS_PER_PAGE]
+        next_cursor = f"{page[-1].position}-{page[-1].id}"
+    return page, next_cursor
+
+
 @login_required
 def dashboard(request):
-    today = timezone.localdate()
-    habits = Habit.objects.filter(user=request.user)
+    today = user_today(request.user)
+
+    if request.method == "POST":
+        # Only the habits that were on the submitted page are touched
+        # [0-9], not isdigit(): see _review
+        visible = [int(i) for i in request.POST.getlist("visible") if re.fullmatch(r"[0-9]+", i)]
+        habits = Habit.objects.filter(user=request.user, id__in=visible).active()
+
+        # One write transaction for the whole form, on the user's shard
+        with transaction.atomic(using=router.db_for_write(HabitLog)):
+            habits = list(habits)
+            logs = {log.habit_id: log for log in HabitLog.objects.filter(habit__in=habits, date=today)}
+
+            for habit in habits:
+                completed = request.POST.get(f"habit_{habit.id}") == "on"
+                log = logs.get(habit.id) or HabitLog(date=today)
+                if log.pk is not None and log.completed == completed:
+                    continue
+                # Attached, so the post_save receivers read habit.user_id
+                # without a SELECT per log
+                log.habit = habit
+                log.completed = completed
+                log.save()
+            update_streak_and_xp(request.user)
+        return redirect(request.get_full_path())
+
+    cursor = parse_cursor(request.GET.get("after"))
+    habits, next_cursor = habit_page(request.user, cursor)
 
     logs = {
         log.habit_id: log.completed
         for log in HabitLog.objects.filter(
-            habit__user=request.user,
+            habit__in=[habit.id for habit in habits],
             date=today
         )
     }
 
-    if request.method == "POST":
-        for habit in habits:
-            completed = request.POST.get(f"habit_{habit.id}") == "on"
-            HabitLog.objects.update_or_create(
-                habit=habit,
-                date=today,
-                defaults={"completed": completed}
-            )
-        update_streak_and_xp(request.user)
-        return redirect("dashboard")
-
     completed_habits = []
     incomplete_habits = []
 
@@ -114,7 +191,7 @@ def dashboard(request):
         else:
             incomplete_habits.append(habit)
 
-    profile = request.user.userprofile
+    profile = get_profile(request.user)
 
     return render(request, "habits/dashboard.html", {
         "completed_habits": completed_habits,
@@ -124,10 +201,68 @@ def dashboard(request):
         "xp":profile.xp,
         "level":profile.level,
         "profile": profile,
+        "badges": badges_for(request.user),
         "username": request.user.first_name or request.user.username,
+        "today": today,
+        "is_first_page": cursor is None,
+        "next_cursor": next_cursor,
     })
 
 
+# -------------------------
+# 🗄️ Archive / Reorder Habits
+# -------------------------
+@login_required
+def archive_habit(request, habit_id):
+    habit = get_object_or_404(Habit, id=habit_id, user=request.user)
+
+    if request.method == "POST":
+        habit.archived = not habit.archived
+        habit.save(update_fields=["archived"])
+        # Other open dashboards only count active habits
+        publish(request.user.id, "habit", {"habit": habit.id, "active": not habit.archived})
+
+    return redirect("archived_habits" if not habit.archived else "dashboard")
+
+
+@login_required
+def archived_habits(request):
+    habits = Habit.objects.filter(user=request.user, archived=True).order_by("name")
+    return render(request, "habits/archived_habits.html", {"habits": habits})
+
+
+@login_required
+def move_habit(request, habit_id, direction):
+    habit = get_object_or_404(Habit, id=habit_id, user=request.user, archived=False)
+
+    if request.method == "POST":
+        siblings = Habit.objects.filter(user=request.user).active().exclude(id=habit.id)
+        if direction == "up":
+            neighbour = siblings.filter(
+                Q(position__lt=habit.position) | Q(position=habit.position, id__lt=habit.id)
+            ).order_by("-position", "-id").first()
+        else:
+            neighbour = siblings.filter(
+                Q(position__gt=habit.position) | Q(position=habit.position, id__gt=habit.id)
+            ).order_by("position", "id").first()
+
+        if neighbour:
+            with transaction.atomic(using=router.db_for_write(Habit)):
+                if neighbour.position == habit.position:
+                    # Tied positions are ordered by id: push the lower one down
+                    lower = neighbour if direction == "up" else habit
+                    lower.position += 1
+                    lower.save(update_fields=["position"])
+                else:
+                    habit.position, neighbour.position = neighbour.position, habit.position
+                    Habit.objects.bulk_update([habit, neighbour], ["position"])
+
+    next_url = request.POST.get("next")
+    if next_url and url_has_allowed_host_and_scheme(next_url, {request.get_host()}):
+        return redirect(next_url)
+    return redirect("dashboard")
+
+
 
 
 # -------------------------
@@ -140,6 +275,8 @@ def add_habit(request):
         if form.is_valid():
             habit = form.save(commit=False)
             habit.user = request.user
+            last = Habit.objects.filter(user=request.user).aggregate(m=Max("position"))["m"]
+            habit.position = (last or 0) + 1
             habit.save()
             return redirect("dashboard")
     else:
@@ -174,7 +311,8 @@ def delete_habit(request, habit_id):
     habit = get_object_or_404(Habit, id=habit_id, user=request.user)
 
     if request.method == "POST":
-        habit.delete()
+        # Hidden at once; purge_deleted removes the logs later
+        soft_delete_habit(habit)
         return redirect("dashboard")
 
     return render(request, "habits/delete_habit.html", {"habit": habit})
@@ -185,25 +323,53 @@ def delete_habit(request, habit_id):
 # -------------------------
 @login_required
 def weekly_analytics(request):
-    today = timezone.localdate()
-    data = []
+    today = user_today(request.user)
+    start = today - timedelta(days=6)
 
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        count = HabitLog.objects.filter(
+    counts = dict(
+        HabitLog.objects.filter(
             habit__user=request.user,
-            date=day,
+            date__range=(start, today),
             completed=True
-        ).count()
+        ).values_list("date").annotate(count=Count("id"))
+    )
 
+    data = []
+    for i in range(7):
+        day = start + timedelta(days=i)
         data.append({
             "day": day.strftime("%a"),
-            "count": count
+            "count": counts.get(day, 0)
         })
 
     return render(request, "habits/weekly.html", {"data": data})
 
 
+# -------------------------
+# 🗓️ Year in Review
+# -------------------------
+def _review(request):
+    today = timezone.localdate()
+    year = request.GET.get("year", "")
+    # [0-9], not isdigit()/\d: those accept "²" and other digits int() rejects
+    year = int(year) if re.fullmatch(r"[0-9]{4}", year) and 1970 <= int(year) <= today.year else today.year
+    return year_in_review(request.user, year, today)
+
+
+@login_required
+def year_in_review_page(request):
+    review = _review(request)
+    return render(request, "habits/year_in_review.html", {
+        "review": review,
+        "chart": json.dumps({key: review[key] for key in ("days", "rolling_7", "rolling_30", "weekdays")}),
+    })
+
+
+@login_required
+def year_in_review_data(request):
+    return JsonResponse(_review(request))
+
+
 # -------------------------
 # 🔥 Heatmap Helpers
 # -------------------------
@@ -226,19 +392,12 @@ def get_color(intensity):
 @login_required
 def heatmap(request):
     user = request.user
-    total_habits = Habit.objects.filter(user=user).count()
+    total_habits = Habit.objects.filter(user=user).active().count()
 
-    today = timezone.localdate()
+    today = user_today(user)
     start_date = today - timedelta(days=365)
 
-    completed_logs = (
-        HabitLog.objects
-        .filter(habit__user=user, completed=True)
-        .values("date")
-        .annotate(count=Count("id"))
-    )
-
-    completed_map = {log["date"]: log["count"] for log in completed_logs}
+    completed_map = completion_counts(user, start_date, today)
 
     heatmap_data = []
     current = start_date
@@ -263,22 +422,42 @@ def heatmap(request):
     })
 
 
+AVATARS = [
+    "avatar1.gif",
+    "avatar2.gif",
+    "avatar3.gif",
+    "avatar4.gif",
+]
+
+
 @login_required
 def profile(request):
-    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    profile = get_profile(request.user)
+    reminder_form = ReminderForm(instance=profile)
 
     if request.method == "POST":
         selected_avatar = request.POST.get("avatar")
         if selected_avatar:
+            # {% avatar %} resolves the name through the static manifest
+            if selected_avatar not in AVATARS:
+                return HttpResponse(status=400)
             profile.avatar = selected_avatar
-            profile.save()
+            # Only the columns this form owns: the profile is the cached
+            # snapshot and run_reminders may have moved next_reminder_at
+            profile.save(update_fields=["avatar"])
             return redirect("profile")
 
+        if "timezone" in request.POST:
+            reminder_form = ReminderForm(request.POST, instance=profile)
+            if reminder_form.is_valid():
+                profile = reminder_form.save(commit=False)
+                profile.next_reminder_at = next_reminder_at(profile)
+                profile.save(update_fields=["reminder_time", "timezone", "next_reminder_at"])
+                return redirect("profile")
+
     total_habits = Habit.objects.filter(user=request.user).count()
-    total_completions = HabitLog.objects.filter(
-        habit__user = request.user,
-        completed=True
-    ).count()
+    completions = completions_by_habit_name(request.user)
+    total_completions = sum(completions.values())
 
     success_rate = (
         int((total_completions / (total_habits * 10)) * 100)
@@ -288,25 +467,103 @@ def profile(request):
     xp_for_next_level = profile.level * 100
     xp_progress = int((profile.xp / xp_for_next_level) * 100)
 
-    top_habit = (
-        HabitLog.objects.filter(habit__user=request.user, completed=True).values("habit__name")
-        .annotate(c=Count("id")).order_by("-c").first()
-    )
-
-    avatars = [
-        "avatar1.gif",
-        "avatar2.gif",
-        "avatar3.gif",
-        "avatar4.gif",
-    ]
+    top_habit = completions.most_common(1)
 
     return render(request, "habits/profile.html", {
         "user": request.user,
         "profile": profile,
         "success_rate": success_rate,
         "xp_progress": min(xp_progress, 100),
-        "top_habit": top_habit["habit__name"] if top_habit else None,
+        "top_habit": top_habit[0][0] if top_habit else None,
         "total_habits": total_habits,
         "total_completions": total_completions,
-        "avatars": avatars,
-    })
\ No newline at end of file
+        "avatars": AVATARS,
+        "badges": badges_for(request.user),
+        "reminder_form": reminder_form,
+    })
+
+
+# -------------------------
+# 🏁 Team Challenges
+# -------------------------
+@login_required
+def challenge_list(request):
+    today = timezone.localdate()
+    mine = set(
+        ChallengeMembership.objects.filter(user=request.user).values_list("challenge_id", flat=True)
+    )
+    items = list(Challenge.objects.filter(Q(end_date__gte=today) | Q(id__in=mine)))
+    counts = challenges.member_counts(items)
+    for challenge in items:
+        challenge.member_count = counts.get(challenge.id, 0)
+        challenge.joined = challenge.id in mine
+
+    return render(request, "habits/challenges.html", {"challenges": items, "today": today})
+
+
+@login_required
+def create_challenge(request):
+    if request.method == "POST":
+        form = ChallengeForm(request.POST)
+        if form.is_valid():
+            challenge = challenges.create_challenge(
+                owner=request.user,
+                name=form.cleaned_data["name"],
+                description=form.cleaned_data["description"],
+                start_date=form.cleaned_data["start_date"],
+                days=form.cleaned_data["days"],
+            )
+            return redirect("challenge_board", challenge_id=challenge.id)
+    else:
+        form = ChallengeForm(initial={"start_date": timezone.localdate()})
+
+    return render(request, "habits/create_challenge.html", {"form": form})
+
+
+@login_required
+def challenge_board(request, challenge_id):
+    challenge = get_object_or_404(Challenge, id=challenge_id)
+    today = timezone.localdate()
+    progress = challenges.board(challenge, today)
+
+    membership = next((m for m in progress["members"] if m.user_id == request.user.id), None)
+    habits = (
+        Habit.objects.filter(user=request.user).active().order_by("position", "id")
+        if membership is None and challenge.end_date >= today else []
+    )
+
+    return render(request, "habits/challenge_board.html", {
+        "challenge": challenge,
+        "membership": membership,
+        "habits": habits,
+        "today": today,
+        **progress,
+    })
+
+
+@login_required
+def join_challenge(request, challenge_id):
+    challenge = get_object_or_404(Challenge, id=challenge_id, end_date__gte=timezone.localdate())
+
+    habit_id = request.POST.get("habit", "")
+    if request.method == "POST" and re.fullmatch(r"[0-9]+", habit_id):
+        habit = get_object_or_404(Habit, id=habit_id, user=request.user, archived=False)
+        if not ChallengeMembership.objects.filter(challenge=challenge, user=request.user).exists():
+            challenges.join(challenge, request.user, habit)
+
+    return redirect("challenge_board", challenge_id=challenge.id)
+
+
+@login_required
+def leave_challenge(request, challenge_id):
+    membership = get_object_or_404(
+        ChallengeMembership.objects.select_related("challenge"),
+        challenge_id=challenge_id, user=request.user,
+    )
+
+    if request.method == "POST":
+        challenges.leave(membership)
+        return redirect("challenge_list")
+
+    return redirect("challenge_board", challenge_id=challenge_id)
+